@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import hashlib
 from abc import ABC
 from enum import Enum
 
@@ -47,6 +48,7 @@ class EvaluableModel(object):
     def __init__(self, discretization=None, normalization=None):
         self.discretization = [] if discretization is None else list(discretization)
         self.normalization = normalization
+        self._sessions = {}
 
     def predict(self, dataframe: pd.DataFrame) -> Iterable:
         """
@@ -60,10 +62,48 @@ class EvaluableModel(object):
     def _predict(self, dataframe: pd.DataFrame) -> Iterable:
         raise NotImplementedError('predict')
 
-    def __convert(self, ys: Iterable) -> Iterable:
-        if self.normalization is not None and not isinstance([p for p in ys if p is not None][0], str):
+    def predict_masked(self, dataframe: pd.DataFrame) -> (np.ndarray | pd.Categorical, np.ndarray):
+        """
+        Predicts the output values of every sample in dataset, as a typed array.
+
+        :param dataframe: is the set of instances to predict.
+        :return: the predictions, either as a float array (NaN for samples that cannot be predicted) or as a
+            categorical (code -1 for samples that cannot be predicted), and the mask of the predicted samples.
+        """
+        values, mask = self._predict_masked(dataframe)
+        if self.normalization is not None and isinstance(values, np.ndarray):
             m, s = self.normalization[list(self.normalization.keys())[-1]]
-            ys = [prediction if prediction is None else prediction * s + m for prediction in ys]
+            values = values * s + m
+        return values, mask
+
+    def _predict_masked(self, dataframe: pd.DataFrame) -> (np.ndarray | pd.Categorical, np.ndarray):
+        return EvaluableModel._mask(self._predict(dataframe))
+
+    @staticmethod
+    def _mask(ys: Iterable) -> (np.ndarray | pd.Categorical, np.ndarray):
+        """
+        Converts predictions holding None for the samples that cannot be predicted into a typed array and a mask.
+        """
+        ys = np.asarray(ys)
+        mask = pd.notna(ys) if ys.dtype == object else np.ones(len(ys), dtype=bool)
+        if ys.dtype.kind in 'fiub':
+            return ys.astype(float), ~np.isnan(ys.astype(float))
+        if ys.dtype.kind in 'US' or any(isinstance(y, str) for y in ys[mask][:1]):
+            return pd.Categorical(ys), mask
+        values = np.full(len(ys), np.nan)
+        values[mask] = ys[mask].astype(float)
+        return values, mask
+
+    def __convert(self, ys: Iterable) -> Iterable:
+        if self.normalization is not None:
+            values, mask = EvaluableModel._mask(ys)
+            if isinstance(values, np.ndarray):
+                m, s = self.normalization[list(self.normalization.keys())[-1]]
+                values = values * s + m
+                if mask.all():
+                    return values
+                ys = np.empty(len(values), dtype=object)
+                ys[mask] = values[mask]
         return ys
 
     def brute_predict(self, dataframe: pd.DataFrame, criterion: str = 'corner', n: int = 2) -> Iterable:
@@ -75,7 +115,9 @@ class EvaluableModel(object):
     def unscale(self, values, name):
         if self.normalization is None or name not in self.normalization or isinstance(values, LinearRegression):
             return values
-        if isinstance(values, Iterable):
+        if isinstance(values, np.ndarray) and values.dtype.kind == 'f':
+            values = values * self.normalization[name][1] + self.normalization[name][0]
+        elif isinstance(values, Iterable):
             values = [None if value is None else
                       value * self.normalization[name][1] + self.normalization[name][0] for value in values]
         else:
@@ -86,30 +128,39 @@ class EvaluableModel(object):
               brute: bool = False, criterion: str = 'corners', n: int = 2,
               task: EvaluableModel.Task = Task.CLASSIFICATION,
               scoring_function: Iterable[EvaluableModel.Score] = [ClassificationScore.ACCURACY]):
-        extracted = np.array(
-            self.predict(dataframe.iloc[:, :-1]) if not brute else
-            self.brute_predict(dataframe.iloc[:, :-1], criterion, n)
-        )
-        idx = [prediction is not None for prediction in extracted]
-        y_extracted = extracted[idx]
-        true = [dataframe.iloc[idx, -1]]
+        return self._scoring_session(predictor).score(dataframe, fidelity, completeness, brute, criterion, n, task,
+                                                      scoring_function)
 
-        if fidelity:
-            if predictor is None:
-                raise ValueError("Predictor must be not None to measure fidelity")
-            true.append(predictor.predict(dataframe.iloc[idx, :-1]).flatten())
+    def scoring_session(self, predictor=None) -> ScoringSession:
+        """
+        Creates a scoring session, computing the predictions of this model (and of the predictor) only once for
+        each dataframe scored within the session.
 
-        if task == EvaluableModel.Task.REGRESSION:
-            y_extracted = self.unscale(y_extracted, dataframe.columns[-1])
-            true = [self.unscale(t, dataframe.columns[-1]) for t in true]
+        :param predictor: the predictor to be used to measure fidelity.
+        :return: the scoring session.
+        """
+        return ScoringSession(self, predictor)
 
-        res = {
-                  score: EvaluableModel.__evaluate(true, y_extracted, score) for score in scoring_function
-              }, sum(idx) / len(idx)
-        return res if completeness else res[0]
+    def _scoring_session(self, predictor=None) -> ScoringSession:
+        """
+        :param predictor: the predictor to be used to measure fidelity.
+        :return: the scoring session shared by all the scores computed with the given predictor, until the model
+            changes.
+        """
+        sessions = self.__dict__.setdefault('_sessions', {})
+        # sessions keep a reference to their predictor, so its id is not reused while the session is alive
+        if id(predictor) not in sessions:
+            sessions[id(predictor)] = self.scoring_session(predictor)
+        return sessions[id(predictor)]
+
+    def _invalidate_sessions(self):
+        """
+        Discards the predictions cached for scoring. It must be called whenever the model changes.
+        """
+        self._sessions = {}
 
     @staticmethod
-    def __evaluate(y, y_hat, scoring_function):
+    def _evaluate(y, y_hat, scoring_function):
         if scoring_function == EvaluableModel.ClassificationScore.ACCURACY:
             f = accuracy_score
         elif scoring_function == EvaluableModel.ClassificationScore.F1:
@@ -137,6 +188,77 @@ class EvaluableModel(object):
         return [f(yy, y_hat) for yy in y]
 
 
+class ScoringSession:
+    """
+    Scores a model on one or more dataframes, with any number of scoring functions.
+    The predictions of the model and of the predictor are computed once per dataframe (and prediction criterion)
+    and cached by dataframe fingerprint, so sessions should not outlive changes to the model.
+    """
+
+    def __init__(self, model: EvaluableModel, predictor=None):
+        self.model = model
+        self.predictor = predictor
+        self._predictions = {}
+        self._oracle = {}
+
+    @staticmethod
+    def fingerprint(dataframe: pd.DataFrame) -> str:
+        """
+        :param dataframe: a dataframe.
+        :return: a digest of the content, index and columns of the dataframe.
+        """
+        digest = hashlib.sha256(pd.util.hash_pandas_object(dataframe, index=True).to_numpy().tobytes())
+        digest.update(repr(list(dataframe.columns)).encode())
+        return digest.hexdigest()
+
+    def predict(self, dataframe: pd.DataFrame, brute: bool = False, criterion: str = 'corners',
+                n: int = 2) -> (np.ndarray | pd.Categorical, np.ndarray):
+        """
+        :param dataframe: the instances to predict.
+        :param brute: if True, a brute prediction is executed.
+        :param criterion: criterion for brute prediction.
+        :param n: number of points for brute prediction with 'perimeter' criterion.
+        :return: the (cached) masked predictions of the model.
+        """
+        key = (ScoringSession.fingerprint(dataframe), brute) + ((criterion, n) if brute else ())
+        if key not in self._predictions:
+            self._predictions[key] = self.model.predict_masked(dataframe) if not brute else \
+                EvaluableModel._mask(self.model.brute_predict(dataframe, criterion, n))
+        return self._predictions[key]
+
+    def predict_oracle(self, dataframe: pd.DataFrame) -> np.ndarray:
+        """
+        :param dataframe: the instances to predict.
+        :return: the (cached) predictions of the predictor.
+        """
+        if self.predictor is None:
+            raise ValueError("Predictor must be not None to measure fidelity")
+        key = ScoringSession.fingerprint(dataframe)
+        if key not in self._oracle:
+            self._oracle[key] = np.asarray(self.predictor.predict(dataframe)).flatten()
+        return self._oracle[key]
+
+    def score(self, dataframe: pd.DataFrame, fidelity: bool = False, completeness: bool = True,
+              brute: bool = False, criterion: str = 'corners', n: int = 2,
+              task: EvaluableModel.Task = EvaluableModel.Task.CLASSIFICATION,
+              scoring_function: Iterable[EvaluableModel.Score] = (EvaluableModel.ClassificationScore.ACCURACY,)):
+        extracted, idx = self.predict(dataframe.iloc[:, :-1], brute, criterion, n)
+        y_extracted = np.asarray(extracted[idx])
+        true = [dataframe.iloc[idx, -1]]
+
+        if fidelity:
+            true.append(self.predict_oracle(dataframe.iloc[:, :-1])[idx])
+
+        if task == EvaluableModel.Task.REGRESSION:
+            y_extracted = self.model.unscale(y_extracted, dataframe.columns[-1])
+            true = [self.model.unscale(t, dataframe.columns[-1]) for t in true]
+
+        res = {
+                  score: EvaluableModel._evaluate(true, y_extracted, score) for score in scoring_function
+              }, float(np.mean(idx))
+        return res if completeness else res[0]
+
+
 class Extractor(EvaluableModel, ABC):
     """
     An explanator capable of extracting rules from trained black box.
@@ -268,24 +390,25 @@ class Extractor(EvaluableModel, ABC):
     @staticmethod
     def divine(predictor, k: int = 5, patience: int = 15, close_to_center: bool = True,
                discretization: Iterable[DiscreteFeature] = None, normalization=None,
-               seed: int = get_default_random_seed()) -> Extractor:
+               seed: int = get_default_random_seed(), neighbours=None) -> Extractor:
         """
         Creates a new DiViNE extractor.
         """
         from psyke.extraction.hypercubic.divine import DiViNE
         return DiViNE(predictor, k=k, patience=patience, close_to_center=close_to_center,
-                      discretization=discretization, normalization=normalization, seed=seed)
+                      discretization=discretization, normalization=normalization, seed=seed, neighbours=neighbours)
 
     @staticmethod
     def cosmik(predictor, max_components: int = 4, k: int = 5, patience: int = 15, close_to_center: bool = True,
                output: Target = Target.CONSTANT, discretization: Iterable[DiscreteFeature] = None, normalization=None,
-               seed: int = get_default_random_seed()) -> Extractor:
+               seed: int = get_default_random_seed(), neighbours=None) -> Extractor:
         """
         Creates a new COSMiK extractor.
         """
         from psyke.extraction.hypercubic.cosmik import COSMiK
         return COSMiK(predictor, max_components=max_components, k=k, patience=patience, close_to_center=close_to_center,
-                      output=output, discretization=discretization, normalization=normalization, seed=seed)
+                      output=output, discretization=discretization, normalization=normalization, seed=seed,
+                      neighbours=neighbours)
 
     @staticmethod
     def iter(predictor, min_update: float = 0.1, n_points: int = 1, max_iterations: int = 600, min_examples: int = 250,
@@ -312,12 +435,12 @@ class Extractor(EvaluableModel, ABC):
     @staticmethod
     def hex(predictor, grid, min_examples: int = 250, threshold: float = 0.1, output: Target = Target.CONSTANT,
             discretization=None, normalization: dict[str, tuple[float, float]] = None,
-            seed: int = get_default_random_seed()) -> Extractor:
+            seed: int = get_default_random_seed(), sparse: bool = False) -> Extractor:
         """
         Creates a new HEx extractor.
         """
         from psyke.extraction.hypercubic.hex import HEx
-        return HEx(predictor, grid, min_examples, threshold, output, discretization, normalization, seed)
+        return HEx(predictor, grid, min_examples, threshold, output, discretization, normalization, seed, sparse)
 
     @staticmethod
     def gridrex(predictor, grid, min_examples: int = 250, threshold: float = 0.1,
@@ -22,15 +22,16 @@ class CREAM(ExACT):
 
     def __eligible_cubes(self, gauss_pred: np.ndarray, node: Node, clusters: int):
         cubes = []
+        data = node.dataframe
         for i in range(len(np.unique(gauss_pred))):
-            df = node.dataframe.iloc[np.where(gauss_pred == i)]
-            if len(df) == 0:
+            positions = node.indices[gauss_pred == i]
+            if len(positions) == 0:
                 continue
-            inner_cube = self._create_cube(df, clusters)
-            indices = self._indices(inner_cube, node.dataframe)
+            inner_cube = self._create_cube(positions, clusters)
+            indices = self._indices(inner_cube, node)
             if indices is None:
                 continue
-            right, left = self._split(inner_cube, node.cube, node.dataframe, indices)
+            right, left = self._split(inner_cube, node.cube, data, indices)
             cubes.append((
                 ((right.diversity + left.diversity) / 2, right.volume(), left.volume(), i),
                 (right, indices), (left, ~indices)
@@ -48,7 +49,7 @@ class CREAM(ExACT):
         while len(to_split) > 0:
             to_split.sort(reverse=True)
             (_, depth, _, node) = to_split.pop()
-            data = ExACT._remove_string_label(node.dataframe)
+            data = self._encoded(node.indices)
             gauss_params = select_gaussian_mixture(data, self.gauss_components)
             gauss_pred = gauss_params[2].predict(data)
             cubes = self.__eligible_cubes(gauss_pred, node, gauss_params[1])
@@ -56,9 +57,8 @@ class CREAM(ExACT):
                 continue
             _, right, left = min(cubes)
             # find_better_constraints(node.dataframe[right[1]], right[0])
-            node.right = Node(node.dataframe[right[1]], right[0])
             node.cube.update(node.dataframe[left[1]], self._predictor)
-            node.left = Node(node.dataframe[left[1]], left[0])
+            node.split(right[1], right[0], left[0])
 
             if depth < self.depth:
                 to_split += [
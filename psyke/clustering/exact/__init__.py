@@ -35,33 +35,46 @@ class ExACT(HyperCubeClustering, ABC):
     def __eligible_cubes(self, gauss_pred: np.ndarray, node: Node, clusters: int):
         cubes = []
         for i in range(len(np.unique(gauss_pred))):
-            df = node.dataframe.iloc[np.where(gauss_pred == i)]
-            if len(df) == 0:
+            positions = node.indices[gauss_pred == i]
+            if len(positions) == 0:
                 continue
-            cubes.append(self._create_cube(df, clusters))
-        indices = [self._indices(cube, node.dataframe) for cube in cubes]
+            cubes.append(self._create_cube(positions, clusters))
+        indices = [self._indices(cube, node) for cube in cubes]
         return cubes, indices
 
-    @staticmethod
-    def _indices(cube: ClosedCube, data: pd.DataFrame) -> np.ndarray | None:
-        indices = cube.filter_indices(data.iloc[:, :-1])
-        if len(data.iloc[indices]) * len(data.iloc[~indices]) == 0:
+    def _indices(self, cube: ClosedCube, node: Node) -> np.ndarray | None:
+        indices = cube.filter_indices(self._matrix[node.indices, :-1])
+        if indices.all() or not indices.any():
             return None
         return indices
 
-    def _create_cube(self, dataframe: pd.DataFrame, clusters: int) -> ClosedCube:
-        data = ExACT._remove_string_label(dataframe)
-        dbscan_pred = DBSCAN(eps=select_dbscan_epsilon(data, clusters)).fit_predict(data.iloc[:, :-1])
+    def _create_cube(self, positions: np.ndarray, clusters: int) -> ClosedCube:
+        data = self._encoded(positions)
+        dbscan_pred = DBSCAN(eps=select_dbscan_epsilon(pd.DataFrame(data), clusters)).fit_predict(data[:, :-1])
         return HyperCube.create_surrounding_cube(
-            dataframe.iloc[np.where(dbscan_pred == Counter(dbscan_pred).most_common(1)[0][0])],
+            self._dataframe.iloc[positions[dbscan_pred == Counter(dbscan_pred).most_common(1)[0][0]]],
             True, self._output
         )
 
+    def _encoded(self, positions: np.ndarray) -> np.ndarray:
+        """
+        :param positions: the positions of some instances.
+        :return: the instances as a matrix, with string labels encoded as integers in order of appearance among them.
+        """
+        data = self._matrix[positions]
+        if self._codes is not None:
+            data[:, -1] = pd.factorize(self._codes[positions])[0]
+        return data
+
     def fit(self, dataframe: pd.DataFrame):
         np.random.seed(self.seed)
         self._predictor.fit(dataframe.iloc[:, :-1], dataframe.iloc[:, -1])
         self._surrounding = HyperCube.create_surrounding_cube(dataframe, True, self._output)
-        self._hypercubes = self._iterate(Node(dataframe, self._surrounding))
+        # the nodes of the tree only hold the positions of their instances in these shared structures
+        self._dataframe, self._matrix = dataframe, ExACT._remove_string_label(dataframe).to_numpy(dtype=float)
+        self._codes = pd.factorize(dataframe.iloc[:, -1])[0] if isinstance(dataframe.iloc[0, -1], str) else None
+        self._hypercubes = self._iterate(Node(dataframe, self._surrounding, np.arange(len(dataframe))))
+        self._dataframe = self._matrix = self._codes = None
 
     def get_hypercubes(self) -> Iterable[HyperCube]:
         return list(self._hypercubes)
@@ -84,7 +97,7 @@ class ExACT(HyperCubeClustering, ABC):
         while len(to_split) > 0:
             to_split.sort(reverse=True)
             (_, depth, _, node) = to_split.pop()
-            data = ExACT._remove_string_label(node.dataframe)
+            data = self._encoded(node.indices)
             gauss_params = select_gaussian_mixture(data, self.gauss_components)
             gauss_pred = gauss_params[2].predict(data)
             cubes, indices = self.__eligible_cubes(gauss_pred, node, gauss_params[1])
@@ -94,10 +107,10 @@ class ExACT(HyperCubeClustering, ABC):
                 continue
             _, _, _, indices, cube = max(cubes)
 
-            cube.update(node.dataframe[indices], self._predictor)
-            node.right = Node(node.dataframe[indices], cube)
-            node.cube.update(node.dataframe[~indices], self._predictor)
-            node.left = Node(node.dataframe[~indices], node.cube)
+            data = node.dataframe
+            cube.update(data[indices], self._predictor)
+            node.cube.update(data[~indices], self._predictor)
+            node.split(indices, cube, node.cube)
 
             if depth < self.depth and cube.diversity > self.error_threshold:
                 to_split.append((cube.diversity, depth + 1, np.random.uniform(), node.right))
@@ -1,3 +1,8 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from itertools import accumulate
+
 import numpy as np
 import pandas as pd
 from kneed import KneeLocator
@@ -5,15 +10,66 @@ from sklearn.cluster import DBSCAN
 from sklearn.mixture import GaussianMixture
 from sklearn.neighbors import NearestNeighbors
 
+from psyke.utils import get_default_n_jobs
 
-def select_gaussian_mixture(data: pd.DataFrame, max_components) -> tuple[float, int, GaussianMixture]:
-    components = range(2, max_components + 1)
-    try:
-        models = [GaussianMixture(n_components=n).fit(data) for n in components if n <= len(data)]
-    except ValueError:
-        print(data)
-        print(len(data))
-    return min([(m.bic(data) / (i + 2), (i + 2), m) for i, m in enumerate(models)])
+
+def stratified_sample(data: pd.DataFrame | np.ndarray, size: int, random_state: np.random.RandomState,
+                      bins: int = 10) -> pd.DataFrame | np.ndarray:
+    """
+    :param data: the instances, with the output as last column.
+    :param size: the number of instances to sample.
+    :param random_state: the random generator used to sample.
+    :param bins: the number of quantile bins used as strata for numeric outputs with more distinct values.
+    :return: a sample of the instances holding each output class (or bin) in the same proportion as the whole data.
+    """
+    output = pd.Series(data[:, -1]) if isinstance(data, np.ndarray) else data.iloc[:, -1]
+    strata = pd.qcut(output, bins, labels=False, duplicates='drop') \
+        if pd.api.types.is_numeric_dtype(output) and output.nunique() > bins else output
+    codes = pd.factorize(strata)[0]
+    positions = []
+    for code in range(codes.max() + 1):
+        stratum = np.flatnonzero(codes == code)
+        n = max(1, int(round(len(stratum) * size / len(data))))
+        positions.append(random_state.choice(stratum, min(n, len(stratum)), replace=False))
+    positions = np.sort(np.concatenate(positions))
+    return data[positions] if isinstance(data, np.ndarray) else data.iloc[positions]
+
+
+def select_gaussian_mixture(data: pd.DataFrame | np.ndarray, max_components, sample_size: int = None,
+                            n_jobs: int = None) -> tuple[float, int, GaussianMixture]:
+    """
+    Selects the number of components (from 2 to max_components) of a Gaussian mixture model of the data by BIC.
+    The candidate models are fitted in parallel threads, each one with its own seed drawn from the numpy random
+    generator, so the result does not depend on the number of threads.
+    When the models are fitted on all the instances, their BIC is approximated from the lower bound of the fit
+    instead of scoring the instances again, so it is only accurate within the convergence tolerance of the fit.
+
+    :param data: the instances.
+    :param max_components: the maximum number of components.
+    :param sample_size: if smaller than the number of instances, the models are fitted on a sample of this size,
+        stratified on the last column, and scored on all the instances.
+    :param n_jobs: the maximum number of models fitted at the same time, by default the default number of jobs.
+    :return: the BIC of the selected model divided by its number of components, the number of components and the
+        model.
+    """
+    components = [n for n in range(2, max_components + 1) if n <= len(data)]
+    seeds = np.random.randint(np.iinfo(np.int32).max, size=len(components))
+    sample = data if sample_size is None or sample_size >= len(data) else \
+        stratified_sample(data, sample_size, np.random.RandomState(np.random.randint(np.iinfo(np.int32).max)))
+
+    def fit(n: int, seed: int) -> tuple[float, int, GaussianMixture]:
+        model = GaussianMixture(n_components=n, random_state=seed).fit(sample)
+        # the lower bound is the mean log-likelihood computed before the last M-step, so it approximates the
+        # log-likelihood of the fitted model within tol (less closely if the fit stopped without converging)
+        log_likelihood = model.lower_bound_ * len(data) if sample is data else model.score(data) * len(data)
+        bic = -2 * log_likelihood + model._n_parameters() * np.log(len(data))
+        return bic / n, n, model
+
+    n_jobs = min(get_default_n_jobs() if n_jobs is None else n_jobs, len(components))
+    if n_jobs <= 1:
+        return min(map(fit, components, seeds))
+    with ThreadPoolExecutor(max_workers=n_jobs) as pool:
+        return min(pool.map(fit, components, seeds))
 
 
 def select_dbscan_epsilon(data: pd.DataFrame, clusters: int) -> float:
@@ -28,12 +84,34 @@ def select_dbscan_epsilon(data: pd.DataFrame, clusters: int) -> float:
             epsilon = kn.knee_y
     except (RuntimeWarning, UserWarning, ValueError):
         epsilon = max(distances[-1], 1e-3)
-    k = 1.
-    dbscan_pred = DBSCAN(eps=epsilon * k).fit_predict(data.iloc[:, :-1])
-    # while Counter(dbscan_pred).most_common(1)[0][0] == -1:
-    for i in range(1000):
-        if len(np.unique(dbscan_pred)) < clusters + 1:
-            break
-        k += .1
-        dbscan_pred = DBSCAN(eps=epsilon * k).fit_predict(data.iloc[:, :-1])
-    return epsilon * k
+    return _increase_dbscan_epsilon(data.iloc[:, :-1], epsilon, clusters)
+
+
+def _increase_dbscan_epsilon(data: pd.DataFrame, epsilon: float, clusters: int, steps: int = 1000) -> float:
+    """
+    Finds the smallest epsilon * k, with k = 1, 1.1, 1.2, ... (at most steps increments), such that DBSCAN finds
+    less than clusters + 1 labels (noise included), assuming that the labels do not increase with epsilon.
+    The candidates are searched with exponentially growing steps and then bisected. DBSCAN runs on a radius
+    neighbours graph, which is only recomputed when a larger candidate is tried.
+    """
+    factors = list(accumulate([1.] + [.1] * steps))
+    neighbours = NearestNeighbors().fit(data)
+    graph, radius = None, None
+
+    def few_labels(step: int) -> bool:
+        nonlocal graph, radius
+        eps = epsilon * factors[step]
+        if graph is None or eps > radius:
+            graph, radius = neighbours.radius_neighbors_graph(data, radius=eps, mode='distance'), eps
+        return len(np.unique(DBSCAN(eps=eps, metric='precomputed').fit_predict(graph))) < clusters + 1
+
+    if few_labels(0):
+        return epsilon * factors[0]
+    # few_labels(lower) is false, few_labels(upper) is true (or upper is the last candidate)
+    lower, upper = 0, 1
+    while upper < steps and not few_labels(upper):
+        lower, upper = upper, min(steps, 2 * upper + 1)
+    while upper - lower > 1:
+        middle = (lower + upper) // 2
+        lower, upper = (lower, middle) if few_labels(middle) else (middle, upper)
+    return epsilon * factors[upper]
@@ -12,6 +12,7 @@ class PedagogicalExtractor(Extractor, ABC):
         Extractor.__init__(self, predictor=predictor, discretization=discretization, normalization=normalization)
 
     def extract(self, dataframe: pd.DataFrame) -> Theory:
+        self._invalidate_sessions()
         new_y = pd.DataFrame(self.predictor.predict(dataframe.iloc[:, :-1])).set_index(dataframe.index)
         data = dataframe.iloc[:, :-1].copy().join(new_y)
         data.columns = dataframe.columns
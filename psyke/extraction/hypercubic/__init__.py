@@ -12,11 +12,13 @@ from tuprolog.theory import Theory, mutable_theory
 from psyke.extraction import PedagogicalExtractor
 from psyke.extraction.hypercubic.hypercube import HyperCube, RegressionCube, ClassificationCube, ClosedCube, Point, \
     GenericCube
+from psyke.extraction.hypercubic.hypercubeset import HyperCubeSet
 from psyke.hypercubepredictor import HyperCubePredictor
 from psyke.schema import Between, Outside, Value
 from psyke.utils.logic import create_variable_list, create_head, to_var, Simplifier
-from psyke.utils import Target
+from psyke.utils import Target, get_default_batch_size
 from psyke.extraction.hypercubic.strategy import Strategy, FixedStrategy
+from psyke.extraction.hypercubic.utils import Oracle
 
 
 class HyperCubeExtractor(HyperCubePredictor, PedagogicalExtractor, ABC):
@@ -24,6 +26,16 @@ class HyperCubeExtractor(HyperCubePredictor, PedagogicalExtractor, ABC):
         HyperCubePredictor.__init__(self, output=output, normalization=normalization)
         PedagogicalExtractor.__init__(self, predictor, discretization=discretization, normalization=normalization)
         self._default_surrounding_cube = False
+        self.batch_size = get_default_batch_size()
+
+    @property
+    def _oracle(self) -> Oracle:
+        """
+        The oracle labelling the samples generated during the extraction. Cubes updated through the oracle read the
+        labels from the last column of the dataframes given to _extract, which are already labelled by the predictor.
+        The predictor is queried with at most batch_size samples at once.
+        """
+        return Oracle(self.predictor, self.batch_size)
 
     def _default_cube(self) -> HyperCube | RegressionCube | ClassificationCube:
         if self._output == Target.CONSTANT:
@@ -161,6 +173,7 @@ class HyperCubeExtractor(HyperCubePredictor, PedagogicalExtractor, ABC):
 
         if self._default_surrounding_cube:
             self._hypercubes[-1].set_default()
+        self._invalidate_cache()
 
         new_theory = mutable_theory()
         for cube in self._hypercubes:
@@ -230,12 +243,37 @@ class Grid:
 
 
 class Node:
-    def __init__(self, dataframe: pd.DataFrame, cube: ClosedCube = None):
-        self.dataframe = dataframe
+    def __init__(self, dataframe: pd.DataFrame, cube: ClosedCube = None, indices: np.ndarray = None):
+        """
+        :param dataframe: the instances of the node or, if indices are given, the instances shared by all the nodes of
+            a tree.
+        :param cube: the hypercube of the node.
+        :param indices: the positions of the instances of the node in the shared dataframe.
+        """
+        self._dataframe = dataframe
+        self.indices = indices
         self.cube: ClosedCube = cube
         self.right: Node | None = None
         self.left: Node | None = None
 
+    @property
+    def dataframe(self) -> pd.DataFrame:
+        return self._dataframe if self.indices is None else self._dataframe.iloc[self.indices]
+
+    def split(self, indices: np.ndarray, right: ClosedCube, left: ClosedCube) -> None:
+        """
+        Creates the children of the node, the right one with the instances selected by indices (a boolean mask) and
+        the left one with the others. Positions in a shared dataframe are stably partitioned in place, so the
+        children hold views of the positions of the node and no node copies instances.
+        """
+        if self.indices is None:
+            self.right, self.left = Node(self._dataframe[indices], right), Node(self._dataframe[~indices], left)
+        else:
+            n = int(indices.sum())
+            self.indices[:] = np.concatenate([self.indices[indices], self.indices[~indices]])
+            self.right = Node(self._dataframe, right, self.indices[:n])
+            self.left = Node(self._dataframe, left, self.indices[n:])
+
     @property
     def children(self) -> list[Node]:
         return [self.right, self.left]
@@ -6,6 +6,7 @@ from tuprolog.theory import Theory
 from psyke import Target, Extractor, get_default_random_seed
 from psyke.clustering.utils import select_gaussian_mixture
 from psyke.extraction.hypercubic import HyperCube, HyperCubeExtractor, RegressionCube
+from psyke.extraction.hypercubic.divine import DiViNE
 
 
 class COSMiK(HyperCubeExtractor):
@@ -15,7 +16,11 @@ class COSMiK(HyperCubeExtractor):
 
     def __init__(self, predictor, max_components: int = 4, k: int = 5, patience: int = 15, close_to_center: bool = True,
                  output: Target = Target.CONSTANT, discretization=None, normalization=None,
-                 seed: int = get_default_random_seed()):
+                 seed: int = get_default_random_seed(), neighbours: np.ndarray = None):
+        """
+        :param neighbours: the precomputed neighbour graph of the instances to extract from (see
+            DiViNE.neighbour_graph), with at least k columns. By default, it is computed when extracting.
+        """
         super().__init__(predictor, Target.REGRESSION, discretization, normalization)
         self.max = max_components
         self.k = k
@@ -23,6 +28,7 @@ class COSMiK(HyperCubeExtractor):
         self.output = output
         self.close_to_center = close_to_center
         self.seed = seed
+        self.neighbours = neighbours
 
     def _extract(self, dataframe: pd.DataFrame) -> Theory:
         np.random.seed(self.seed)
@@ -32,8 +38,10 @@ class COSMiK(HyperCubeExtractor):
         gmm = GaussianMixture(n)
         gmm.fit(X, y)
 
+        # the graph only depends on the instances, so it can be shared by repeated extractions from them
+        neighbours = DiViNE.neighbour_graph(X, self.k) if self.neighbours is None else self.neighbours
         divine = Extractor.divine(gmm, self.k, self.patience, self.close_to_center,
-                                  self.discretization, self.normalization)
+                                  self.discretization, self.normalization, neighbours=neighbours)
         df = X.join(pd.DataFrame(gmm.predict(X)))
         df.columns = dataframe.columns
         divine.extract(df)
@@ -41,7 +49,7 @@ class COSMiK(HyperCubeExtractor):
         self._hypercubes = [HyperCube(cube.dimensions.copy()) if self.output == Target.CONSTANT else
                             RegressionCube(cube.dimensions.copy()) for cube in divine._hypercubes]
         for cube in self._hypercubes:
-            cube.update(dataframe, self.predictor)
+            cube.update(dataframe, self._oracle)
 
         self._sort_cubes()
         return self._create_theory(dataframe)
\ No newline at end of file
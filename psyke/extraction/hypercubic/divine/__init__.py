@@ -5,6 +5,7 @@ from tuprolog.theory import Theory
 from psyke import Target, get_default_random_seed
 from psyke.extraction.hypercubic import HyperCubeExtractor
 from psyke.extraction.hypercubic.hypercube import Point, GenericCube, HyperCube
+from psyke.extraction.hypercubic.index import NeighbourIndex
 
 from sklearn.neighbors import BallTree
 
@@ -15,72 +16,88 @@ class DiViNE(HyperCubeExtractor):
     """
 
     def __init__(self, predictor, k: int = 5, patience: int = 15, close_to_center: bool = True,
-                 discretization=None, normalization=None, seed: int = get_default_random_seed()):
+                 discretization=None, normalization=None, seed: int = get_default_random_seed(),
+                 neighbours: np.ndarray = None):
+        """
+        :param neighbours: the precomputed neighbour graph of the instances to extract from (see neighbour_graph), with
+            at least k columns. By default, it is computed when extracting.
+        """
         super().__init__(predictor, Target.CLASSIFICATION, discretization, normalization)
         self.k = k
+        self.neighbours = neighbours
         self.patience = patience
         self.vicinity_function = DiViNE.closest_to_center if close_to_center else DiViNE.closest_to_corners
         self.seed = seed
 
     @staticmethod
-    def __pop(data: pd.DataFrame, idx: int = None) -> (Point, pd.DataFrame):
-        if idx is None:
-            idx = data.sample(1).index.values[0]
-        t = data.T
-        return DiViNE.__to_point(t.pop(idx)), t.T.reset_index(drop=True)
-
-    @staticmethod
-    def __to_point(instance) -> Point:
-        point = Point(instance.index.values, instance.values)
-        return point
+    def __to_point(columns: list[str], instance: np.ndarray, label) -> Point:
+        return Point(columns, instance.tolist() + [label])
 
     def __to_cube(self, point: Point) -> GenericCube:
         cube = HyperCube.cube_from_point(point.dimensions, self._output)
         cube._output = list(point.dimensions.values())[-1]
         return cube
 
+    @staticmethod
+    def neighbour_graph(data: pd.DataFrame, k: int) -> np.ndarray:
+        """
+        :param data: the instances, without the output column.
+        :param k: the number of neighbours.
+        :return: the positions (n_instances x k) of the k nearest neighbours of each instance, itself included.
+        """
+        return BallTree(data).query(data, k=k, return_distance=False)
+
     def __clean(self, data: pd.DataFrame) -> pd.DataFrame:
-        _, idx = BallTree(data.iloc[:, :-1]).query(data.iloc[:, :-1], k=self.k)
-        # how many output classes are associated with the k neighbors
-        count = np.array(list(map(lambda indices: len(data.iloc[indices].iloc[:, -1].unique()), idx)))
+        if self.neighbours is None:
+            idx = DiViNE.neighbour_graph(data.iloc[:, :-1], self.k)
+        elif len(self.neighbours) != len(data) or self.neighbours.shape[1] < self.k:
+            raise ValueError(f'The neighbour graph must have {len(data)} rows and at least {self.k} columns')
+        else:
+            idx = self.neighbours[:, :self.k]
+        # the output classes associated with the k neighbors
+        classes = pd.factorize(data.iloc[:, -1])[0][idx]
         # instances with neighbors of different classes are discarded
-        return data[count == 1]
-
-    def __closest(self, data: pd.DataFrame, cube: GenericCube) -> (Point, pd.DataFrame):
-        return DiViNE.__pop(data, self.vicinity_function(BallTree(data.iloc[:, :-1]), cube))
+        return data[(classes == classes[:, :1]).all(axis=1)]
 
     @staticmethod
-    def closest_to_center(tree: BallTree, cube: GenericCube):
-        return tree.query([list(cube.center.dimensions.values())], k=1)[1][0][-1]
+    def closest_to_center(neighbours: NeighbourIndex, cube: GenericCube) -> int:
+        return neighbours.nearest(np.array([list(cube.center.dimensions.values())]))[1][0]
 
     @staticmethod
-    def closest_to_corners(tree: BallTree, cube: GenericCube):
-        distance, idx = tree.query([list(point.dimensions.values()) for point in cube.corners()], k=1)
-        return idx[np.argmin(distance)][-1]
+    def closest_to_corners(neighbours: NeighbourIndex, cube: GenericCube) -> int:
+        distance, idx = neighbours.nearest(np.array([list(point.dimensions.values()) for point in cube.corners()]))
+        return idx[np.argmin(distance)]
 
     def _extract(self, dataframe: pd.DataFrame) -> Theory:
         self._surrounding = HyperCube.create_surrounding_cube(dataframe, output=Target.CLASSIFICATION)
         np.random.seed(self.seed)
         data = self.__clean(dataframe)
+        columns, labels = list(data.columns), data.iloc[:, -1].to_numpy()
+        # the remaining instances are the alive points of the index, in the order given by order
+        neighbours = NeighbourIndex(data.iloc[:, :-1].to_numpy(dtype=float))
+        order = np.arange(len(data))
 
-        while len(data) > 0:
+        while len(neighbours) > 0:
             discarded = []
             patience = self.patience
-            point, data = self.__pop(data)
-            cube = self.__to_cube(point)
+            idx = order[np.random.choice(len(order), 1, replace=False)[0]]
+            neighbours.remove([idx])
+            cube = self.__to_cube(DiViNE.__to_point(columns, neighbours.points[idx], labels[idx]))
 
-            while patience > 0 and len(data) > 0:
-                other, data = self.__closest(data, cube)
-                if cube.output == list(other.dimensions.values())[-1]:
-                    cube = cube.merge_with_point(other)
-                    data = data[~(cube.filter_indices(data.iloc[:, :-1]))].reset_index(drop=True)
+            while patience > 0 and len(neighbours) > 0:
+                other = self.vicinity_function(neighbours, cube)
+                neighbours.remove([other])
+                if cube.output == labels[other]:
+                    cube = cube.merge_with_point(DiViNE.__to_point(columns, neighbours.points[other], labels[other]))
+                    bounds = np.array(list(cube.dimensions.values()))
+                    neighbours.remove(neighbours.within(bounds[:, 0], bounds[:, 1]))
                 else:
                     patience -= 1
                     discarded.append(other)
             if cube.volume() > 0:
-                cube.update(dataframe, self.predictor)
+                cube.update(dataframe, self._oracle)
                 self._hypercubes.append(cube)
-            if len(discarded) > 0:
-                data = pd.concat([data] + [d.to_dataframe() for d in discarded]).reset_index(drop=True)
+            order = np.concatenate([order[neighbours.alive[order]], discarded]).astype(int)
+            neighbours.add(discarded)
         self._sort_cubes()
         return self._create_theory(dataframe)
@@ -1,13 +1,15 @@
 from __future__ import annotations
-from itertools import product
+import heapq
+from itertools import product, count
 from typing import Iterable
 import numpy as np
 import pandas as pd
 from sklearn.base import ClassifierMixin
 from tuprolog.theory import Theory
 from psyke import get_default_random_seed
-from psyke.utils import Target
+from psyke.utils import Target, get_int_precision
 from psyke.extraction.hypercubic import HyperCubeExtractor, Grid, HyperCube
+from psyke.extraction.hypercubic.utils import SamplePool, CubeStatistics
 
 
 class GridEx(HyperCubeExtractor):
@@ -15,6 +17,83 @@ class GridEx(HyperCubeExtractor):
     Explanator implementing GridEx algorithm, doi:10.1007/978-3-030-82017-6_2.
     """
 
+    class Partition:
+        """
+        A regular partitioning of a hypercube, mapping each cell to the hypercube (or to the nested partition)
+        covering it.
+        """
+
+        def __init__(self, ranges: dict[str, list[tuple[float, float]]]):
+            self.features = list(ranges.keys())
+            self.edges = [np.array([a for a, _ in r] + [r[-1][1]]) for r in ranges.values()]
+            self.sizes = [(r[-1][1] - r[0][0]) / len(r) if len(r) > 1 else r[0][1] - r[0][0] for r in ranges.values()]
+            self.children: dict[int, HyperCube | GridEx.Partition] = {}
+
+        @property
+        def shape(self) -> tuple[int, ...]:
+            return tuple(len(edges) - 1 for edges in self.edges)
+
+        def add(self, cube: HyperCube):
+            # hypercube bounds may be rounded, so they are matched to the closest edges
+            cells = [range(*[int(np.argmin(abs(edges - bound))) for bound in cube[feature]])
+                     for feature, edges in zip(self.features, self.edges)]
+            for cell in product(*cells):
+                self.children[int(np.ravel_multi_index(cell, self.shape))] = cube
+
+        def replace(self, cube: HyperCube, partition: GridEx.Partition):
+            for cell, child in self.children.items():
+                if child is cube:
+                    self.children[cell] = partition
+
+        def split_features(self) -> set[str]:
+            features = {feature for feature, n in zip(self.features, self.shape) if n > 1}
+            for child in set(c for c in self.children.values() if isinstance(c, GridEx.Partition)):
+                features |= child.split_features()
+            return features
+
+        def cells(self, data: np.ndarray) -> np.ndarray:
+            """
+            :param data: the points to locate (n_points x n_features).
+            :return: the cell of each point, -1 for points outside the partition or too close to an edge.
+            """
+            cells = np.zeros(len(data), dtype=int)
+            inside = np.ones(len(data), dtype=bool)
+            for i, (edges, size) in enumerate(zip(self.edges, self.sizes)):
+                n = len(edges) - 1
+                if n == 1:
+                    continue
+                x = data[:, i]
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    bins = np.clip(np.nan_to_num(np.floor((x - edges[0]) / size)), 0, n - 1).astype(int)
+                bins = np.clip(bins - (x < edges[bins]), 0, n - 1)
+                bins = np.clip(bins + (x >= edges[bins + 1]), 0, n - 1)
+                inside &= (edges[0] <= x) & (x < edges[-1]) & \
+                    (x - edges[bins] >= HyperCube.EPSILON) & (edges[bins + 1] - x >= HyperCube.EPSILON)
+                cells = cells * n + bins
+            return np.where(inside, cells, -1)
+
+        def locate(self, data: np.ndarray, indices: dict[int, int]) -> np.ndarray:
+            """
+            :param data: the points to locate (n_points x n_features).
+            :param indices: the position of each hypercube, by id.
+            :return: the position of the hypercube covering each point, -1 if the point is not covered.
+            """
+            result = np.full(len(data), -1)
+            stack = [(self, np.arange(len(data)))]
+            while len(stack) > 0:
+                partition, rows = stack.pop()
+                cells = partition.cells(data[rows])
+                rows, cells = rows[cells >= 0], cells[cells >= 0]
+                order = np.argsort(cells, kind='stable')
+                unique, starts = np.unique(cells[order], return_index=True)
+                for cell, group in zip(unique, np.split(rows[order], starts[1:])):
+                    child = partition.children.get(int(cell))
+                    if isinstance(child, GridEx.Partition):
+                        stack.append((child, group))
+                    elif child is not None:
+                        result[group] = indices.get(id(child), -1)
+            return result
+
     def __init__(self, predictor, grid: Grid, min_examples: int, threshold: float, output: Target = Target.CONSTANT,
                  discretization=None, normalization=None, seed: int = get_default_random_seed()):
         super().__init__(predictor, Target.CLASSIFICATION if isinstance(predictor, ClassifierMixin) else output,
@@ -22,10 +101,13 @@ class GridEx(HyperCubeExtractor):
         self.grid = grid
         self.min_examples = min_examples
         self.threshold = threshold
+        self._grid: GridEx.Partition | None = None
+        self._sparse = False
         np.random.seed(seed)
 
     def _extract(self, dataframe: pd.DataFrame) -> Theory:
         self._hypercubes = []
+        self._grid = None
         self._surrounding = HyperCube.create_surrounding_cube(dataframe, output=self._output)
         self._surrounding.init_diversity(2 * self.threshold)
         self._iterate(dataframe)
@@ -43,77 +125,231 @@ class GridEx(HyperCubeExtractor):
                 ranges[feature] = [(a + size * i, a + size * (i + 1)) for i in range(n_bins)]
         return ranges
 
-    def _cubes_to_split(self, cube, iteration, dataframe, fake, keep_empty=False):
-        to_split = []
-        for p in product(*self._create_ranges(cube, iteration).values()):
+    @staticmethod
+    def _count_cells(ranges: Iterable[list[tuple[float, float]]], data: np.ndarray) -> dict[tuple[int, ...], int]:
+        """
+        :param ranges: the bins of each feature, in the order of the columns of data.
+        :param data: the points to count.
+        :return: the number of points in each non-empty cell, identified by its bin position along each feature, in
+            the same order as the product of the bins.
+        """
+        inside = np.ones(len(data), dtype=bool)
+        positions = np.empty(data.shape, dtype=int)
+        for j, bins in enumerate(ranges):
+            lower, upper = np.array([a for a, _ in bins]), np.array([b for _, b in bins])
+            position = np.maximum(np.searchsorted(lower, data[:, j], side='right') - 1, 0)
+            inside &= (lower[position] <= data[:, j]) & (data[:, j] < upper[position])
+            positions[:, j] = position
+        cells, counts = np.unique(positions[inside], axis=0, return_counts=True)
+        return dict(zip(map(tuple, cells.tolist()), counts.tolist()))
+
+    @staticmethod
+    def _adjacent_cells(cells: Iterable[tuple[int, ...]], shape: tuple[int, ...]) -> list[tuple[int, ...]]:
+        """
+        :param cells: some cells, identified by their bin position along each feature.
+        :param shape: the number of bins of each feature.
+        :return: the given cells and the cells sharing a face with them, in the same order as the product of the bins.
+        """
+        cells = np.array(list(cells), dtype=int).reshape(-1, len(shape))
+        adjacent = [cells]
+        for j in range(len(shape)):
+            for step in (-1, 1):
+                moved = cells.copy()
+                moved[:, j] += step
+                adjacent.append(moved[(moved[:, j] >= 0) & (moved[:, j] < shape[j])])
+        return list(map(tuple, np.unique(np.concatenate(adjacent), axis=0).tolist()))
+
+    def _create_cells(self, cube, iteration, dataframe, data: np.ndarray, keep_empty=False) -> \
+            (list[HyperCube], list[pd.DataFrame]):
+        ranges = list(self._create_ranges(cube, iteration).values())
+        counts = GridEx._count_cells(ranges, data)
+        if not keep_empty:
+            positions = counts.keys()
+        elif self._sparse:
+            positions = GridEx._adjacent_cells(counts.keys(), tuple(len(r) for r in ranges))
+        else:
+            positions = product(*[range(len(r)) for r in ranges])
+        cells, samples = [], []
+        for p in positions:
             cube = self._default_cube()
             for i, f in enumerate(dataframe.columns[:-1]):
-                cube.update_dimension(f, p[i])
-            n = cube.count(dataframe)
-            if n > 0 or keep_empty:
-                fake = pd.concat([fake, cube.create_samples(self.min_examples - n)])
-                cube.update(fake, self.predictor)
-                to_split.append(cube)
+                cube.update_dimension(f, ranges[i][p[i]])
+            n = counts.get(p, 0)
+            cells.append(cube)
+            samples.append(cube.create_samples(self.min_examples - n))
+        return cells, samples
+
+    def _cubes_to_split(self, cubes: Iterable[HyperCube], iteration, dataframe, fake: SamplePool,
+                        keep_empty=False) -> (list[list[HyperCube]], SamplePool):
+        """
+        Splits all the given cubes at once: the samples of all the cells are labelled by a single (batched) oracle
+        query before updating the cells.
+        :return: the cells of each cube and the samples including the new ones.
+        """
+        to_split, samples = [], []
+        data = dataframe.iloc[:, :-1].to_numpy(dtype=float)
+        for cube in cubes:
+            cells, cell_samples = self._create_cells(cube, iteration, dataframe, data, keep_empty)
+            to_split.append(cells)
+            samples += [s for s in cell_samples if len(s) > 0]
+        if len(samples) > 0:
+            fake.append(self._oracle.label(pd.concat(samples, ignore_index=True), dataframe.columns[-1]))
+        for cells in to_split:
+            for cell in cells:
+                cell.update(fake, self._oracle)
         return to_split, fake
 
+    def _add_partition(self, cube: HyperCube, iteration: int, children: Iterable[HyperCube],
+                       parents: dict[int, GridEx.Partition]) -> bool:
+        partition = GridEx.Partition(self._create_ranges(cube, iteration))
+        if np.prod(partition.shape, dtype=float) > np.iinfo(int).max:
+            # the cells cannot be addressed by integers
+            return False
+        for child in children:
+            partition.add(child)
+            parents[id(child)] = partition
+        if id(cube) in parents:
+            parents[id(cube)].replace(cube, partition)
+        else:
+            self._grid = partition
+        return True
+
     def _iterate(self, dataframe: pd.DataFrame):
-        fake = dataframe.copy()
+        fake = SamplePool(dataframe)
         prev = [self._surrounding]
         next_iteration = []
+        parents = {}
+        indexed = True
 
         for iteration in self.grid.iterate():
             next_iteration = []
+            to_expand = []
             for cube in prev:
                 if cube.count(dataframe) == 0:
                     continue
                 if cube.diversity < self.threshold:
                     self._hypercubes += [cube]
                     continue
-                to_split, fake = self._cubes_to_split(cube, iteration, dataframe, fake)
-                next_iteration += [c for c in self._merge(to_split, fake)]
+                to_expand.append(cube)
+            splits, fake = self._cubes_to_split(to_expand, iteration, dataframe, fake)
+            for cube, to_split in zip(to_expand, splits):
+                merged = [c for c in self._merge(to_split, fake)]
+                indexed = indexed and self._add_partition(cube, iteration, merged, parents)
+                next_iteration += merged
             prev = next_iteration.copy()
         self._hypercubes += [cube for cube in next_iteration]
+        # the grid is ambiguous when a feature ignored by the hypercubes is split at some level
+        if not indexed or self._grid is not None and \
+                len(self._grid.split_features() & self._dimensions_to_ignore) > 0:
+            self._grid = None
+
+    def _find_cube_indices(self, dataframe: pd.DataFrame) -> np.ndarray:
+        # the grid refers to the hypercube objects, which are not kept by packed hypercubes
+        if self._grid is None or not isinstance(self._hypercubes, list):
+            return super()._find_cube_indices(dataframe)
+        indices = self._grid.locate(dataframe[self._grid.features].to_numpy(dtype=float),
+                                    {id(cube): i for i, cube in enumerate(self._hypercubes)})
+        missing = indices < 0
+        if missing.any():
+            indices[missing] = super()._find_cube_indices(dataframe[missing])
+        return indices
 
     @staticmethod
-    def _find_couples(to_split: Iterable[HyperCube], not_in_cache: Iterable[HyperCube],
-                      adjacent_cache: dict[tuple[HyperCube, HyperCube], str | None]) -> \
-            Iterable[tuple[HyperCube, HyperCube, str]]:
-        checked = []
-        eligible = []
-        for cube in to_split:
-            checked.append(cube)
-            for other_cube in [c for c in to_split if c not in checked]:
-                if (cube in not_in_cache) or (other_cube in not_in_cache):
-                    adjacent_cache[(cube, other_cube)] = cube.is_adjacent(other_cube)
-                adjacent_feature = adjacent_cache[(cube, other_cube)]
-                eligible.append((cube, other_cube, adjacent_feature))
-        return [couple for couple in eligible if couple[2] is not None]
-
-    def _evaluate_merge(self, not_in_cache: Iterable[HyperCube],
-                        dataframe: pd.DataFrame, feature: str,
-                        cube: HyperCube, other_cube: HyperCube,
-                        merge_cache: dict[(HyperCube, HyperCube), HyperCube | None]) -> bool:
-        if (cube in not_in_cache) or (other_cube in not_in_cache):
-            merged_cube = cube.merge_along_dimension(other_cube, feature)
-            merged_cube.update(dataframe, self.predictor)
-            merge_cache[(cube, other_cube)] = merged_cube
-        return cube.output == other_cube.output if self._output == Target.CLASSIFICATION else \
-            merge_cache[(cube, other_cube)].diversity < self.threshold
-
-    def _merge(self, to_split: Iterable[HyperCube], dataframe: pd.DataFrame) -> Iterable[HyperCube]:
-        not_in_cache = [cube for cube in to_split]
-        adjacent_cache = {}
-        merge_cache = {}
-        cont = True
-        while cont:
-            to_merge = [([cube, other_cube], merge_cache[(cube, other_cube)]) for cube, other_cube, feature in
-                        GridEx._find_couples(to_split, not_in_cache, adjacent_cache) if
-                        self._evaluate_merge(not_in_cache, dataframe, feature, cube, other_cube, merge_cache)]
-            if len(to_merge) == 0:
-                cont = False
-            else:
-                sorted(to_merge, key=lambda c: c[1].diversity)
-                best = to_merge[0]
-                to_split = [cube for cube in to_split if cube not in best[0]] + [best[1]]
-                not_in_cache = [best[1]]
-        return to_split
+    def _faces(cube: HyperCube) -> Iterable[tuple[str, tuple, tuple]]:
+        """
+        :return: for each dimension of the cube, the keys of its lower and upper faces along that dimension. Two
+            cubes are adjacent along a dimension if the upper face of one of them is the lower face of the other.
+        """
+        for feature, (a, b) in cube.dimensions.items():
+            others = tuple((f, tuple(d)) for f, d in cube.dimensions.items() if f != feature)
+            yield feature, (feature, a, others), (feature, b, others)
+
+    @staticmethod
+    def _index_faces(i: int, cube: HyperCube, lower: dict[tuple, set[int]], upper: dict[tuple, set[int]],
+                     remove: bool = False):
+        for _, lower_face, upper_face in GridEx._faces(cube):
+            for faces, face in [(lower, lower_face), (upper, upper_face)]:
+                if remove:
+                    faces[face].discard(i)
+                else:
+                    faces.setdefault(face, set()).add(i)
+
+    @staticmethod
+    def _neighbours(cube: HyperCube, lower: dict[tuple, set[int]], upper: dict[tuple, set[int]]) -> \
+            list[tuple[int, str]]:
+        """
+        :return: the indexed cubes adjacent to the given one and the dimension along which they are adjacent.
+        """
+        neighbours = [(j, feature) for feature, lower_face, upper_face in GridEx._faces(cube)
+                      for j in lower.get(upper_face, set()) | upper.get(lower_face, set())]
+        return sorted(neighbours)
+
+    def _statistics(self, cube: HyperCube, dataframe: SamplePool) -> (CubeStatistics, np.ndarray):
+        """
+        :return: the statistics of the samples inside the cube and their positions.
+        """
+        rows = np.flatnonzero(cube.filter_indices(dataframe))
+        labels = dataframe.codes if self._output == Target.CLASSIFICATION else dataframe.y
+        return CubeStatistics.from_samples(dataframe.x[rows], labels[rows], self._output), rows
+
+    def _evaluate_merge(self, cube: HyperCube, other_cube: HyperCube, statistics: CubeStatistics,
+                        rows: list[np.ndarray], dataframe: SamplePool) -> float | None:
+        """
+        :param statistics: the statistics of the union of the two cubes.
+        :param rows: the positions of the samples inside each cube.
+        :return: the diversity of the union of the two cubes if they can be merged, None otherwise.
+        """
+        if self._output == Target.CLASSIFICATION:
+            return statistics.misclassification if cube.output == other_cube.output else None
+        if self._output == Target.REGRESSION:
+            rows = np.concatenate(rows)
+            coefficients = statistics.least_squares()
+            diversity = np.abs(coefficients[0] + dataframe.x[rows] @ coefficients[1:] -
+                               dataframe.y[rows].astype(float)).mean()
+        else:
+            diversity = statistics.std
+        return diversity if diversity < self.threshold else None
+
+    def _merge(self, to_split: Iterable[HyperCube], dataframe: SamplePool) -> Iterable[HyperCube]:
+        """
+        Greedily merges adjacent cubes, merging first the couple whose union has the lowest diversity.
+        Adjacent cubes are found through an index of their faces and candidate merges are kept in a heap, so after
+        each merge only the couples involving the new cube are evaluated. Candidates are evaluated by combining the
+        statistics of the two cubes; only the merged cubes are updated from their samples.
+        :return: the remaining cubes, followed by the merged cubes in the order they were created.
+        """
+        cubes = dict(enumerate(to_split))
+        statistics = {i: self._statistics(cube, dataframe) for i, cube in cubes.items()}
+        lower, upper = {}, {}
+        for i, cube in cubes.items():
+            GridEx._index_faces(i, cube, lower, upper)
+        candidates, sequence = [], count()
+
+        def push(i: int, j: int, feature: str):
+            diversity = self._evaluate_merge(cubes[i], cubes[j], statistics[i][0] + statistics[j][0],
+                                             [statistics[i][1], statistics[j][1]], dataframe)
+            if diversity is not None:
+                # rounding errors must not break ties, which are resolved in the order the couples are evaluated
+                heapq.heappush(candidates, (round(diversity, get_int_precision()), next(sequence), i, j, feature))
+
+        for i, cube in list(cubes.items()):
+            for j, feature in GridEx._neighbours(cube, lower, upper):
+                if j > i:
+                    push(i, j, feature)
+        new_index = count(len(cubes))
+        while len(candidates) > 0:
+            _, _, i, j, feature = heapq.heappop(candidates)
+            if i not in cubes or j not in cubes:
+                continue
+            merged_cube = cubes[i].merge_along_dimension(cubes[j], feature)
+            rows = np.sort(np.concatenate([statistics[i][1], statistics[j][1]]))
+            merged_cube.update(dataframe[rows], self._oracle)
+            k = next(new_index)
+            statistics[k] = (statistics.pop(i)[0] + statistics.pop(j)[0], rows)
+            for n in (i, j):
+                GridEx._index_faces(n, cubes.pop(n), lower, upper, remove=True)
+            cubes[k] = merged_cube
+            for n, feature in GridEx._neighbours(merged_cube, lower, upper):
+                push(n, k, feature)
+            GridEx._index_faces(k, merged_cube, lower, upper)
+        return list(cubes.values())
@@ -8,6 +8,7 @@ import pandas as pd
 from psyke import get_default_random_seed, Target
 from psyke.extraction.hypercubic import Grid, HyperCube, GenericCube, ClassificationCube
 from psyke.extraction.hypercubic.gridex import GridEx
+from psyke.extraction.hypercubic.utils import SamplePool
 
 
 class HEx(GridEx):
@@ -34,8 +35,8 @@ class HEx(GridEx):
                 return other.cube.output != self.cube.output
             return other.cube.error - self.cube.error > self.threshold * .6
 
-        def indices(self, dataframe: pd.DataFrame):
-            return self.cube.filter_indices(dataframe.iloc[:, :-1])
+        def indices(self, dataframe: SamplePool):
+            return self.cube.filter_indices(dataframe)
 
         def eligible_children(self, dataframe) -> Iterable[HEx.Node]:
             return [c for c in self.children if c.cube.count(dataframe) > 0]
@@ -43,11 +44,11 @@ class HEx(GridEx):
         def permanent_children(self, dataframe) -> Iterable[HEx.Node]:
             return [c for c in self.eligible_children(dataframe) if c.gain]
 
-        def permanent_indices(self, dataframe):
-            return np.any([c.cube.filter_indices(dataframe.iloc[:, :-1])
+        def permanent_indices(self, dataframe: SamplePool):
+            return np.any([c.cube.filter_indices(dataframe)
                            for c in self.eligible_children(dataframe) if c.gain], axis=0)
 
-        def update(self, dataframe: pd.DataFrame, predictor, recursive=False):
+        def update(self, dataframe: SamplePool, predictor, recursive=False):
             if recursive:
                 for node in self.children:
                     node.update(dataframe, predictor, recursive)
@@ -64,9 +65,14 @@ class HEx(GridEx):
                    [(c, depth) for c in self.permanent_children(dataframe)]
 
     def __init__(self, predictor, grid: Grid, min_examples: int, threshold: float, output: Target = Target.CONSTANT,
-                 discretization=None, normalization=None, seed: int = get_default_random_seed()):
+                 discretization=None, normalization=None, seed: int = get_default_random_seed(), sparse: bool = False):
+        """
+        :param sparse: if True, empty cells are only kept when adjacent to non-empty ones, instead of keeping all the
+            cells of the grid; this keeps the number of cells linear in the number of features.
+        """
         super().__init__(predictor, grid, min_examples, threshold, output, discretization, normalization, seed)
         self._default_surrounding_cube = True
+        self._sparse = sparse
 
     def _gain(self, parent_cube: GenericCube, new_cube: GenericCube) -> float:
         if isinstance(parent_cube, ClassificationCube):
@@ -74,25 +80,24 @@ class HEx(GridEx):
         return parent_cube.error - new_cube.error > self.threshold * .6
 
     def _iterate(self, dataframe: pd.DataFrame):
-        fake = dataframe.copy()
-        self._surrounding.update(dataframe, self.predictor)
+        fake = SamplePool(dataframe)
+        self._surrounding.update(dataframe, self._oracle)
         root = HEx.Node(self._surrounding, threshold=self.threshold)
         current = [root]
 
         for iteration in self.grid.iterate():
             next_iteration = []
-            for node in current:
-                if node.cube.diversity < self.threshold:
-                    continue
-                children, fake = self._cubes_to_split(node.cube, iteration, dataframe, fake, True)
+            to_expand = [node for node in current if not node.cube.diversity < self.threshold]
+            splits, fake = self._cubes_to_split([node.cube for node in to_expand], iteration, dataframe, fake, True)
+            for node, children in zip(to_expand, splits):
                 node.children = [HEx.Node(c, node, threshold=self.threshold) for c in children]
-                cleaned = node.update(fake, self.predictor, False)
+                cleaned = node.update(fake, self._oracle, False)
                 node.children = [HEx.Node(c, node, threshold=self.threshold) for c in self._merge(
                     [c for c, _ in cleaned], fake)]
                 next_iteration += [n for n in node.children]
 
             current = next_iteration.copy()
-        _ = root.update(fake, self.predictor, True)
+        _ = root.update(fake, self._oracle, True)
         self._hypercubes = []
         linearized = root.linearize(fake)
         for depth in sorted(np.unique([d for (_, d) in linearized]), reverse=True):
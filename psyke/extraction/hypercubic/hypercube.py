@@ -1,13 +1,14 @@
 from __future__ import annotations
 
 import itertools
-from statistics import mode
 from functools import reduce
 from typing import Iterable, Union
 import pandas as pd
 from numpy import ndarray
 
-from psyke.extraction.hypercubic.utils import Dimension, Dimensions, MinUpdate, ZippedDimension, Limit, Expansion
+from psyke.extraction.hypercubic.index import OverlapIndex
+from psyke.extraction.hypercubic.utils import Dimension, Dimensions, MinUpdate, ZippedDimension, Limit, Expansion, \
+    Oracle, SamplePool
 from psyke.schema import Between, GreaterThan, LessThan
 from psyke.utils import get_default_precision, get_int_precision, Target, get_default_random_seed
 from psyke.utils.logic import create_term, to_rounded_real, linear_function_creator
@@ -118,9 +119,9 @@ class HyperCube:
         return True
 
     def __eq__(self, other: HyperCube) -> bool:
-        return all([(abs(dimension.this_dimension[0] - dimension.other_dimension[0]) < HyperCube.EPSILON)
-                    & (abs(dimension.this_dimension[1] - dimension.other_dimension[1]) < HyperCube.EPSILON)
-                    for dimension in self._zip_dimensions(other)])
+        return all(abs(a1 - a2) < HyperCube.EPSILON and abs(b1 - b2) < HyperCube.EPSILON
+                   for (a1, b1), (a2, b2) in ((dimension, other[feature])
+                                              for feature, dimension in self._dimensions.items()))
 
     def __getitem__(self, feature: str) -> Dimension:
         if feature in self._dimensions.keys():
@@ -194,14 +195,39 @@ class HyperCube:
             min(self.get_second(update.name) + update.value / ratio, surrounding.get_second(update.name))
         ))
 
-    def filter_indices(self, dataset: pd.DataFrame) -> ndarray:
+    @staticmethod
+    def _to_array(dataset: pd.DataFrame | ndarray | SamplePool) -> ndarray:
+        if isinstance(dataset, SamplePool):
+            return dataset.x
+        return dataset if isinstance(dataset, ndarray) else dataset.to_numpy()
+
+    @staticmethod
+    def _features(dataset: pd.DataFrame | SamplePool) -> pd.DataFrame | SamplePool:
+        return dataset if isinstance(dataset, SamplePool) else dataset.iloc[:, :-1]
+
+    def filter_indices(self, dataset: pd.DataFrame | ndarray | SamplePool) -> ndarray:
         v = np.array([v for _, v in self._dimensions.items()])
-        ds = dataset.to_numpy(copy=True)
+        ds = HyperCube._to_array(dataset)
         return np.all((v[:, 0] <= ds) & (ds < v[:, 1]), axis=1)
 
     def filter_dataframe(self, dataset: pd.DataFrame) -> pd.DataFrame:
         return dataset[self.filter_indices(dataset)]
 
+    def _filter_predictions(self, dataset: pd.DataFrame | SamplePool, predictor) -> (pd.DataFrame, ndarray):
+        """
+        :param dataset: the samples, holding their labels as last column if the predictor is an Oracle.
+        :param predictor: the predictor, or an Oracle whose labels are read from the dataset.
+        :return: the samples inside this hypercube (without the last column) and their predicted outputs.
+        """
+        indices = self.filter_indices(HyperCube._features(dataset))
+        if isinstance(dataset, SamplePool):
+            filtered, labels = pd.DataFrame(dataset.x[indices], columns=dataset.features), dataset.y[indices]
+        else:
+            filtered, labels = dataset.iloc[:, :-1][indices], dataset.iloc[:, -1].to_numpy()[indices]
+        if isinstance(predictor, Oracle):
+            return filtered, labels
+        return filtered, predictor.predict(filtered) if len(filtered) > 0 else np.array([])
+
     def _zip_dimensions(self, other: HyperCube) -> list[ZippedDimension]:
         return [ZippedDimension(dimension, self[dimension], other[dimension]) for dimension in self.dimensions]
 
@@ -228,10 +254,11 @@ class HyperCube:
     def check_overlap(to_check: Iterable[HyperCube], hypercubes: Iterable[HyperCube]) -> bool:
         checked = []
         to_check_copy = list(to_check).copy()
+        index = OverlapIndex(hypercubes)
         while len(to_check_copy) > 0:
             cube = to_check_copy.pop()
-            for hypercube in hypercubes:
-                if hypercube not in checked and cube.overlap(hypercube):
+            for position in index.overlapping(cube):
+                if index[position] not in checked:
                     return True
             checked += [cube]
         return False
@@ -241,8 +268,8 @@ class HyperCube:
         new_cube.copy_infinite_dimensions(self._infinite_dimensions)
         return new_cube
 
-    def count(self, dataset: pd.DataFrame) -> int:
-        return self.filter_dataframe(dataset.iloc[:, :-1]).shape[0]
+    def count(self, dataset: pd.DataFrame | SamplePool) -> int:
+        return int(self.filter_indices(HyperCube._features(dataset)).sum())
 
     def interval_to_value(self, dimension, unscale=None):
         if dimension not in self._infinite_dimensions:
@@ -294,9 +321,7 @@ class HyperCube:
         if isinstance(hypercubes, Iterable):
             return any([self.equal(cube) for cube in hypercubes])
         else:
-            return all([(abs(dimension.this_dimension[0] - dimension.other_dimension[0]) < HyperCube.EPSILON)
-                        & (abs(dimension.this_dimension[1] - dimension.other_dimension[1]) < HyperCube.EPSILON)
-                        for dimension in self._zip_dimensions(hypercubes)])
+            return self == hypercubes
 
     def expand(self, expansion: Expansion, hypercubes: Iterable[HyperCube]) -> None:
         feature = expansion.feature
@@ -319,6 +344,21 @@ class HyperCube:
     def get_second(self, feature: str) -> float:
         return self[feature][1]
 
+    def get_interval(self, feature: str) -> Dimension:
+        """
+        :param feature: the feature of interest
+        :return: the interval of the feature, with infinite dimensions mapped to -inf/+inf
+        """
+        lower, upper = self[feature]
+        directions = self._infinite_dimensions.get(feature, [])
+        if len(directions) == 2:
+            return -np.inf, np.inf
+        if '+' in directions:
+            return lower, np.inf
+        if '-' in directions:
+            return -np.inf, upper
+        return lower, upper
+
     def has_volume(self) -> bool:
         return all([dimension[1] - dimension[0] > HyperCube.EPSILON for dimension in self._dimensions.values()])
 
@@ -412,7 +452,9 @@ class HyperCube:
         return self.merge(HyperCube.cube_from_point(other.dimensions))
 
     # TODO: maybe two different methods are more readable and easier to debug
-    def overlap(self, hypercubes: Iterable[HyperCube] | HyperCube) -> HyperCube | bool | None:
+    def overlap(self, hypercubes: OverlapIndex | Iterable[HyperCube] | HyperCube) -> HyperCube | bool | None:
+        if isinstance(hypercubes, OverlapIndex):
+            return hypercubes.overlap(self)
         if isinstance(hypercubes, Iterable):
             for hypercube in hypercubes:
                 if (self != hypercube) & self.overlap(hypercube):
@@ -421,9 +463,8 @@ class HyperCube:
         elif self is hypercubes:
             return False
         else:
-            return all([not ((dimension.other_dimension[0] >= dimension.this_dimension[1]) |
-                             (dimension.this_dimension[0] >= dimension.other_dimension[1]))
-                        for dimension in self._zip_dimensions(hypercubes)])
+            return all(a2 < b1 and a1 < b2 for (a1, b1), (a2, b2) in
+                       ((dimension, hypercubes[feature]) for feature, dimension in self._dimensions.items()))
 
     # TODO: maybe two different methods are more readable and easier to debug
     def update_dimension(self, feature: str, lower: float | tuple[float, float], upper: float | None = None) -> None:
@@ -432,13 +473,12 @@ class HyperCube:
         else:
             self.update_dimension(feature, (lower, upper))
 
-    def update(self, dataset: pd.DataFrame, predictor) -> None:
-        filtered = self.filter_dataframe(dataset.iloc[:, :-1])
-        predictions = predictor.predict(filtered)
+    def update(self, dataset: pd.DataFrame | SamplePool, predictor) -> None:
+        filtered, predictions = self._filter_predictions(dataset, predictor)
         self._output = np.mean(predictions)
         self._diversity = np.std(predictions)
         self._error = (abs(predictions - self._output)).mean()
-        means = filtered.describe().loc['mean']
+        means = filtered.mean()
         self._barycenter = Point(means.index.values, means.values)
 
     # TODO: why this is not a property?
@@ -450,13 +490,12 @@ class RegressionCube(HyperCube):
     def __init__(self, dimension: dict[str, tuple] = None, limits: set[Limit] = None, output=None):
         super().__init__(dimension=dimension, limits=limits, output=LinearRegression() if output is None else output)
 
-    def update(self, dataset: pd.DataFrame, predictor) -> None:
-        filtered = self.filter_dataframe(dataset.iloc[:, :-1])
+    def update(self, dataset: pd.DataFrame | SamplePool, predictor) -> None:
+        filtered, predictions = self._filter_predictions(dataset, predictor)
         if len(filtered > 0):
-            predictions = predictor.predict(filtered)
             self._output.fit(filtered, predictions)
             self._diversity = self._error = (abs(self._output.predict(filtered) - predictions)).mean()
-            means = filtered.describe().loc['mean']
+            means = filtered.mean()
             self._barycenter = Point(means.index.values, means.values)
 
     def copy(self) -> RegressionCube:
@@ -487,14 +526,29 @@ class ClassificationCube(HyperCube):
     def __init__(self, dimension: dict[str, tuple] = None, limits: set[Limit] = None, output: str = ""):
         super().__init__(dimension=dimension, limits=limits, output=output)
 
-    def update(self, dataset: pd.DataFrame, predictor) -> None:
-        filtered = self.filter_dataframe(dataset.iloc[:, :-1])
-        if len(filtered > 0):
-            predictions = predictor.predict(filtered)
-            self._output = mode(predictions)
-            self._diversity = self._error = 1 - sum(p == self.output for p in predictions) / len(predictions)
-            means = filtered.describe().loc['mean']
-            self._barycenter = Point(means.index.values, means.values)
+    @staticmethod
+    def _mode(codes: ndarray, counts: ndarray) -> int:
+        """
+        :return: the most frequent code; among equally frequent codes, the first one encountered.
+        """
+        modes = np.flatnonzero(counts == counts.max())
+        return modes[0] if len(modes) == 1 else codes[np.isin(codes, modes)][0]
+
+    def update(self, dataset: pd.DataFrame | SamplePool, predictor) -> None:
+        if isinstance(dataset, SamplePool) and isinstance(predictor, Oracle):
+            indices = self.filter_indices(dataset)
+            x, labels, codes, features = dataset.x[indices], dataset.y[indices], dataset.codes[indices], \
+                dataset.features
+        else:
+            filtered, labels = self._filter_predictions(dataset, predictor)
+            x, codes, features = filtered.to_numpy(dtype=float), pd.factorize(labels)[0], list(filtered.columns)
+        if len(codes) > 0:
+            counts = np.bincount(codes)
+            code = ClassificationCube._mode(codes, counts)
+            self._output = labels[np.argmax(codes == code)]
+            self._diversity = self._error = 1 - int(counts[code]) / len(codes)
+            # column-major layout, so that means are summed column by column as pandas does
+            self._barycenter = Point(features, np.asfortranarray(x).mean(axis=0))
 
     def copy(self) -> ClassificationCube:
         new_cube = ClassificationCube(self.dimensions.copy(), self._limits.copy(), self.output)
@@ -540,9 +594,9 @@ class ClosedCube(HyperCube):
             raise TypeError("Invalid type for obj parameter")
         return True
 
-    def filter_indices(self, dataset: pd.DataFrame) -> ndarray:
+    def filter_indices(self, dataset: pd.DataFrame | ndarray | SamplePool) -> ndarray:
         v = np.array([v for _, v in self._dimensions.items()])
-        ds = dataset.to_numpy(copy=True)
+        ds = HyperCube._to_array(dataset)
         return np.all((v[:, 0] <= ds) & (ds <= v[:, 1]), axis=1)
 
     def copy(self) -> ClosedCube:
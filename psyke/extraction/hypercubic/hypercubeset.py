@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+from numbers import Real
+from typing import Iterable, Iterator
+
+import numpy as np
+from sklearn.linear_model import LinearRegression
+
+from psyke.extraction.hypercubic.hypercube import HyperCube, RegressionCube, ClassificationCube, ClosedCube, \
+    ClosedRegressionCube, ClosedClassificationCube, GenericCube, Point, FeatureNotFoundException
+
+
+class HyperCubeSet:
+    """
+    A collection of hypercubes stored as a structure of arrays.
+    The hypercubes keep their order; single hypercubes are materialised on demand as (detached) cube objects, so
+    existing code iterating over a list of hypercubes can iterate over a HyperCubeSet as well.
+    Limits are only used while extracting and are not stored.
+    """
+
+    KINDS = (HyperCube, RegressionCube, ClassificationCube, ClosedCube, ClosedRegressionCube, ClosedClassificationCube)
+    LOWER_INFINITE = 1
+    UPPER_INFINITE = 2
+
+    def __init__(self, features: list[str], lower: np.ndarray, upper: np.ndarray, infinite: np.ndarray,
+                 kinds: np.ndarray, default: np.ndarray, outputs: np.ndarray, coefficients: np.ndarray,
+                 diversity: np.ndarray, error: np.ndarray, barycenter: np.ndarray, models: dict[int, object] = None):
+        """
+        :param features: the dimensions of the hypercubes.
+        :param lower: the lower bounds of the hypercubes (n_cubes x n_features), NaN for missing dimensions.
+        :param upper: the upper bounds of the hypercubes (n_cubes x n_features), NaN for missing dimensions.
+        :param infinite: the infinite directions of each dimension (n_cubes x n_features), as a bit mask.
+        :param kinds: the position in KINDS of the class of each hypercube.
+        :param default: whether each hypercube is a default one.
+        :param outputs: the constant output of each hypercube, NaN for regression hypercubes.
+        :param coefficients: the intercept and coefficients of the linear model of each regression hypercube
+            (n_cubes x n_features + 1), NaN for other hypercubes and for models that are not fitted.
+        :param diversity: the diversity of each hypercube.
+        :param error: the error of each hypercube.
+        :param barycenter: the barycenter of each hypercube (n_cubes x n_features), NaN if not computed.
+        :param models: the output models of regression hypercubes that cannot be represented by coefficients.
+        """
+        self.features = list(features)
+        self.lower = lower
+        self.upper = upper
+        self.infinite = infinite
+        self.kinds = kinds
+        self.default = default
+        self.outputs = outputs
+        self.coefficients = coefficients
+        self.diversity = diversity
+        self.error = error
+        self.barycenter = barycenter
+        self.models = {} if models is None else models
+
+    @staticmethod
+    def from_cubes(cubes: Iterable[GenericCube], features: list[str] = None) -> HyperCubeSet:
+        """
+        :param cubes: the hypercubes to pack.
+        :param features: the dimensions of the hypercubes, by default the dimensions of all the hypercubes in order.
+        :return: a HyperCubeSet holding the same hypercubes.
+        """
+        if isinstance(cubes, HyperCubeSet):
+            return cubes if features is None or cubes.features == list(features) else cubes.reorder(features)
+        cubes = list(cubes)
+        if features is None:
+            features = list(dict.fromkeys(feature for cube in cubes for feature in cube.dimensions))
+        columns = {feature: i for i, feature in enumerate(features)}
+        n, d = len(cubes), len(features)
+        lower, upper, barycenter = np.full((n, d), np.nan), np.full((n, d), np.nan), np.full((n, d), np.nan)
+        infinite = np.zeros((n, d), dtype=np.int8)
+        coefficients = np.full((n, d + 1), np.nan)
+        outputs, models = [], {}
+        for i, cube in enumerate(cubes):
+            for feature, (a, b) in cube.dimensions.items():
+                lower[i, columns[feature]], upper[i, columns[feature]] = a, b
+            for feature, directions in cube._infinite_dimensions.items():
+                infinite[i, columns[feature]] = (HyperCubeSet.LOWER_INFINITE if '-' in directions else 0) | \
+                    (HyperCubeSet.UPPER_INFINITE if '+' in directions else 0)
+            for feature, value in cube.barycenter.dimensions.items():
+                if feature in columns:
+                    barycenter[i, columns[feature]] = value
+            if isinstance(cube, RegressionCube):
+                outputs.append(np.nan)
+                coef = np.ravel(getattr(cube.output, 'coef_', []))
+                if isinstance(cube.output, LinearRegression) and len(coef) == d:
+                    coefficients[i] = np.concatenate([np.ravel(cube.output.intercept_)[:1], coef])
+                elif hasattr(cube.output, 'coef_') or not isinstance(cube.output, LinearRegression):
+                    models[i] = cube.output
+            else:
+                outputs.append(cube.output)
+        kinds = np.array([HyperCubeSet._kind(cube) for cube in cubes], dtype=np.int8)
+        return HyperCubeSet(features, lower, upper, infinite, kinds,
+                            np.array([cube.is_default for cube in cubes], dtype=bool), HyperCubeSet._pack(outputs),
+                            coefficients, np.array([cube.diversity for cube in cubes], dtype=float),
+                            np.array([cube.error for cube in cubes], dtype=float), barycenter, models)
+
+    @staticmethod
+    def _kind(cube: GenericCube) -> int:
+        if type(cube) not in HyperCubeSet.KINDS:
+            raise TypeError(f'Hypercubes of type {type(cube).__name__} cannot be packed')
+        return HyperCubeSet.KINDS.index(type(cube))
+
+    @staticmethod
+    def _pack(outputs: list) -> np.ndarray:
+        if all(isinstance(output, Real) for output in outputs):
+            return np.array(outputs, dtype=float)
+        if all(isinstance(output, str) for output in outputs):
+            return np.array(outputs, dtype=str)
+        packed = np.empty(len(outputs), dtype=object)
+        packed[:] = outputs
+        return packed
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def __iter__(self) -> Iterator[GenericCube]:
+        return (self.cube(i) for i in range(len(self)))
+
+    def __getitem__(self, item: int | slice | np.ndarray) -> GenericCube | HyperCubeSet:
+        if isinstance(item, (int, np.integer)):
+            return self.cube(range(len(self))[item])
+        indices = np.arange(len(self))[item]
+        positions = {int(index): i for i, index in enumerate(indices)}
+        return HyperCubeSet(self.features, self.lower[indices], self.upper[indices], self.infinite[indices],
+                            self.kinds[indices], self.default[indices], self.outputs[indices],
+                            self.coefficients[indices], self.diversity[indices], self.error[indices],
+                            self.barycenter[indices], {positions[i]: model for i, model in self.models.items()
+                                                       if i in positions})
+
+    def __add__(self, other: HyperCubeSet | Iterable[GenericCube]) -> HyperCubeSet:
+        other = HyperCubeSet.from_cubes(other, self.features)
+        offset = len(self)
+        return HyperCubeSet(self.features, *[np.concatenate([a, b]) for a, b in zip(
+            [self.lower, self.upper, self.infinite, self.kinds, self.default],
+            [other.lower, other.upper, other.infinite, other.kinds, other.default]
+        )], HyperCubeSet._pack(list(self.outputs) + list(other.outputs)), *[np.concatenate([a, b]) for a, b in zip(
+            [self.coefficients, self.diversity, self.error, self.barycenter],
+            [other.coefficients, other.diversity, other.error, other.barycenter]
+        )], {**self.models, **{i + offset: model for i, model in other.models.items()}})
+
+    def reorder(self, features: list[str]) -> HyperCubeSet:
+        """
+        :param features: the new order of the dimensions, possibly a subset of them.
+        :return: a HyperCubeSet with the dimensions in the given order.
+        """
+        columns = self.columns(features)
+        return HyperCubeSet(features, self.lower[:, columns], self.upper[:, columns], self.infinite[:, columns],
+                            self.kinds, self.default, self.outputs, np.full((len(self), len(features) + 1), np.nan),
+                            self.diversity, self.error, self.barycenter[:, columns],
+                            {**{i: self._linear_model(i) for i in np.flatnonzero(~np.isnan(self.coefficients[:, 0]))},
+                             **self.models})
+
+    def columns(self, features: list[str]) -> list[int]:
+        """
+        :param features: some dimensions of the hypercubes.
+        :return: the column of each dimension in the bound matrices.
+        """
+        columns = {feature: i for i, feature in enumerate(self.features)}
+        for feature in features:
+            if feature not in columns:
+                raise FeatureNotFoundException(feature)
+        return [columns[feature] for feature in features]
+
+    @property
+    def closed(self) -> np.ndarray:
+        return np.array([issubclass(kind, ClosedCube) for kind in HyperCubeSet.KINDS])[self.kinds]
+
+    @property
+    def regression(self) -> np.ndarray:
+        return np.array([issubclass(kind, RegressionCube) for kind in HyperCubeSet.KINDS])[self.kinds]
+
+    def intervals(self, features: list[str]) -> (np.ndarray, np.ndarray):
+        """
+        :param features: some dimensions of the hypercubes.
+        :return: the lower and upper bounds (n_cubes x n_features) of the given dimensions, with infinite
+            dimensions mapped to -inf/+inf.
+        """
+        columns = self.columns(features)
+        missing = np.isnan(self.lower[:, columns]).any(axis=0)
+        if missing.any():
+            raise FeatureNotFoundException(features[int(np.argmax(missing))])
+        infinite = self.infinite[:, columns]
+        return np.where(infinite & HyperCubeSet.LOWER_INFINITE, -np.inf, self.lower[:, columns]), \
+            np.where(infinite & HyperCubeSet.UPPER_INFINITE, np.inf, self.upper[:, columns])
+
+    def volumes(self) -> np.ndarray:
+        sides = self.upper - self.lower
+        return np.prod(np.where(np.isnan(sides), 1., sides), axis=1)
+
+    def _linear_model(self, i: int) -> LinearRegression:
+        model = LinearRegression()
+        if not np.isnan(self.coefficients[i, 0]):
+            model.coef_ = self.coefficients[i, 1:].copy()
+            model.intercept_ = self.coefficients[i, 0].item()
+        return model
+
+    def cube(self, i: int) -> GenericCube:
+        """
+        :param i: the position of the hypercube.
+        :return: a new cube object equal to the i-th hypercube; changes to it are not reflected in the set.
+        """
+        kind = HyperCubeSet.KINDS[self.kinds[i]]
+        if issubclass(kind, RegressionCube):
+            output = self.models[i] if i in self.models else self._linear_model(i)
+        else:
+            output = self.outputs[i].item() if isinstance(self.outputs[i], np.generic) else self.outputs[i]
+        cube = kind(output=output)
+        defined = [(feature, j) for j, feature in enumerate(self.features) if not np.isnan(self.lower[i, j])]
+        cube._dimensions = {feature: (self.lower[i, j].item(), self.upper[i, j].item()) for feature, j in defined}
+        cube._infinite_dimensions = {
+            feature: (['-'] if self.infinite[i, j] & HyperCubeSet.LOWER_INFINITE else []) +
+                     (['+'] if self.infinite[i, j] & HyperCubeSet.UPPER_INFINITE else [])
+            for feature, j in defined if self.infinite[i, j]
+        }
+        cube._diversity = self.diversity[i].item()
+        cube._error = self.error[i].item()
+        barycenter = [(feature, self.barycenter[i, j].item()) for j, feature in enumerate(self.features)
+                      if not np.isnan(self.barycenter[i, j])]
+        cube._barycenter = Point([feature for feature, _ in barycenter], [value for _, value in barycenter])
+        if self.default[i]:
+            cube.set_default()
+        return cube
@@ -0,0 +1,316 @@
+from __future__ import annotations
+
+from typing import Iterable, Iterator
+import numpy as np
+from sklearn.neighbors import BallTree
+
+from psyke.utils import get_default_precision
+
+
+class HyperCubeIndex:
+    """
+    A bounding volume hierarchy over a list of hypercubes.
+    Queries return, for each point, the lowest index among the hypercubes containing it (i.e., the same hypercube
+    that an ordered scan of the list would find first), so priorities encoded in the list order are kept.
+    """
+
+    LEAF_SIZE = 16
+
+    def __init__(self, lower: np.ndarray, upper: np.ndarray, closed: np.ndarray, leaf_size: int = LEAF_SIZE):
+        """
+        :param lower: the lower bounds of the hypercubes (n_cubes x n_features), possibly -inf.
+        :param upper: the upper bounds of the hypercubes (n_cubes x n_features), possibly +inf.
+        :param closed: whether each hypercube also contains its upper bounds.
+        :param leaf_size: the maximum number of hypercubes in a leaf.
+        """
+        self._lower = lower
+        self._upper = upper
+        self._closed = closed
+        self.leaf_size = leaf_size
+        self._node_lower: list[np.ndarray] = []
+        self._node_upper: list[np.ndarray] = []
+        self._first: list[int] = []
+        self._children: list[tuple[int, int] | None] = []
+        self._cubes: list[np.ndarray | None] = []
+        if len(lower) > 0:
+            self._build()
+
+    def __len__(self) -> int:
+        return len(self._lower)
+
+    def _centers(self) -> np.ndarray:
+        finite_lower = np.where(np.isfinite(self._lower), self._lower, np.where(np.isfinite(self._upper),
+                                                                                self._upper, 0.))
+        finite_upper = np.where(np.isfinite(self._upper), self._upper, finite_lower)
+        return (finite_lower + finite_upper) / 2
+
+    def _add_node(self, cubes: np.ndarray) -> int:
+        self._node_lower.append(self._lower[cubes].min(axis=0))
+        self._node_upper.append(self._upper[cubes].max(axis=0))
+        self._first.append(int(cubes.min()))
+        self._children.append(None)
+        self._cubes.append(np.sort(cubes))
+        return len(self._first) - 1
+
+    def _build(self):
+        centers = self._centers()
+        to_split = [self._add_node(np.arange(len(self._lower)))]
+        while len(to_split) > 0:
+            node = to_split.pop()
+            cubes = self._cubes[node]
+            if len(cubes) <= self.leaf_size:
+                continue
+            node_centers = centers[cubes]
+            spread = node_centers.max(axis=0) - node_centers.min(axis=0)
+            dimension = int(np.argmax(spread))
+            if spread[dimension] <= 0:
+                continue
+            order = cubes[np.argsort(node_centers[:, dimension], kind='stable')]
+            half = len(order) // 2
+            self._children[node] = (self._add_node(order[:half]), self._add_node(order[half:]))
+            self._cubes[node] = None
+            to_split += list(self._children[node])
+
+    def _leaf_query(self, cubes: np.ndarray, points: np.ndarray) -> np.ndarray:
+        points = points[:, np.newaxis, :]
+        lower, upper, closed = self._lower[cubes], self._upper[cubes], self._closed[cubes]
+        inside = np.all((lower <= points) & ((points < upper) | (closed[:, np.newaxis] & (points == upper))), axis=2)
+        return np.where(inside.any(axis=1), cubes[inside.argmax(axis=1)], -1)
+
+    def query(self, points: np.ndarray) -> np.ndarray:
+        """
+        :param points: the points to locate (n_points x n_features).
+        :return: the index of the first hypercube containing each point, -1 if no hypercube contains it.
+        """
+        result = np.full(len(points), -1)
+        if len(self._first) == 0:
+            return result
+        stack = [(0, np.arange(len(points)))]
+        while len(stack) > 0:
+            node, rows = stack.pop()
+            rows = rows[(result[rows] < 0) | (result[rows] > self._first[node])]
+            candidates = points[rows]
+            rows = rows[np.all((self._node_lower[node] <= candidates) &
+                               (candidates <= self._node_upper[node]), axis=1)]
+            if len(rows) == 0:
+                continue
+            if self._children[node] is None:
+                found = self._leaf_query(self._cubes[node], points[rows])
+                better = (found >= 0) & ((result[rows] < 0) | (found < result[rows]))
+                result[rows[better]] = found[better]
+            else:
+                stack += [(child, rows) for child in sorted(self._children[node], key=lambda c: -self._first[c])]
+        return result
+
+
+class OverlapIndex:
+    """
+    The bounds of a list of hypercubes stored as arrays, to be kept alongside the list while extracting.
+    For each dimension, the hypercubes are sorted by their lower bound and the widest one is recorded: a hypercube
+    overlapping the queried one along a dimension starts between the lower bound of the query minus the widest width
+    and the upper bound of the query, which is a contiguous range of the sorted hypercubes. Overlap queries only check
+    the hypercubes in the narrowest of these ranges, on all the dimensions at once.
+    Hypercubes added or changed since the hypercubes were last sorted are kept apart and always checked; they are
+    sorted again when they become too many. Queries are sub-linear as long as the hypercubes are spread along some
+    dimension, and linear in the worst case (e.g., when a hypercube spans all the others along every dimension).
+    Hypercubes changed after being added must be refreshed with `update`.
+    """
+
+    def __init__(self, hypercubes: Iterable = (), epsilon: float = None):
+        """
+        :param hypercubes: the hypercubes to index, all with the same dimensions.
+        :param epsilon: the precision used to compare bounds, by default the default precision.
+        """
+        self.epsilon = get_default_precision() if epsilon is None else epsilon
+        self.features: list[str] | None = None
+        self._cubes = []
+        self._positions: dict[int, int] = {}
+        self._lower = np.empty((0, 0))
+        self._upper = np.empty((0, 0))
+        # positions of the hypercubes sorted by lower bound, one column per dimension, and the sorted lower bounds
+        self._order = np.empty((0, 0), dtype=int)
+        self._sorted = np.empty((0, 0))
+        self._width = np.empty(0)
+        self._pending: set[int] = set()
+        for cube in hypercubes:
+            self.add(cube)
+
+    def __len__(self) -> int:
+        return len(self._cubes)
+
+    def __iter__(self) -> Iterator:
+        return iter(self._cubes)
+
+    def __getitem__(self, position: int):
+        return self._cubes[position]
+
+    def _bounds(self, cube) -> (np.ndarray, np.ndarray):
+        bounds = np.array([cube[feature] for feature in self.features], dtype=float).reshape(-1, 2)
+        return bounds[:, 0], bounds[:, 1]
+
+    def add(self, cube) -> None:
+        if self.features is None:
+            self.features = list(cube.dimensions.keys())
+            self._lower, self._upper = np.empty((8, len(self.features))), np.empty((8, len(self.features)))
+        n = len(self._cubes)
+        if n == len(self._lower):
+            self._lower = np.concatenate([self._lower, np.empty_like(self._lower)])
+            self._upper = np.concatenate([self._upper, np.empty_like(self._upper)])
+        self._lower[n], self._upper[n] = self._bounds(cube)
+        self._positions[id(cube)] = n
+        self._cubes.append(cube)
+        self._pending.add(n)
+
+    def update(self, cube) -> None:
+        """
+        :param cube: a hypercube of the index whose bounds have changed.
+        """
+        n = self._positions[id(cube)]
+        self._lower[n], self._upper[n] = self._bounds(cube)
+        self._pending.add(n)
+
+    def _sort(self) -> None:
+        n = len(self._cubes)
+        self._order = np.argsort(self._lower[:n], axis=0, kind='stable')
+        self._sorted = np.take_along_axis(self._lower[:n], self._order, axis=0)
+        self._width = (self._upper[:n] - self._lower[:n]).max(axis=0)
+        self._pending = set()
+
+    def overlapping(self, cube) -> np.ndarray:
+        """
+        :param cube: a hypercube with the same dimensions of the indexed ones.
+        :return: the positions, in ascending order, of the indexed hypercubes overlapping the given one (the hypercube
+            itself excluded).
+        """
+        if len(self._cubes) == 0:
+            return np.array([], dtype=int)
+        if len(self._pending) > max(16, int(np.sqrt(len(self._cubes)))):
+            self._sort()
+        lower, upper = self._bounds(cube)
+        candidates = np.fromiter(self._pending, dtype=int, count=len(self._pending))
+        if len(self._order) > 0:
+            # the slack accounts for rounding in the difference between the bounds
+            first = np.array([np.searchsorted(self._sorted[:, d], lower[d] - self._width[d] - self.epsilon, 'left')
+                              for d in range(len(lower))])
+            last = np.array([np.searchsorted(self._sorted[:, d], upper[d], 'left') for d in range(len(upper))])
+            d = int(np.argmin(last - first))
+            candidates = np.concatenate([self._order[first[d]:last[d], d], candidates])
+        candidates = np.unique(candidates)
+        candidates = candidates[np.all((self._lower[candidates] < upper) & (lower < self._upper[candidates]), axis=1)]
+        if id(cube) in self._positions:
+            candidates = candidates[candidates != self._positions[id(cube)]]
+        return candidates
+
+    def _equal(self, cube, positions: np.ndarray) -> np.ndarray:
+        lower, upper = self._bounds(cube)
+        return np.all((np.abs(self._lower[positions] - lower) < self.epsilon) &
+                      (np.abs(self._upper[positions] - upper) < self.epsilon), axis=1)
+
+    def equal(self, cube) -> bool:
+        """
+        :return: whether an indexed hypercube has the same bounds of the given one, up to the precision.
+        """
+        return bool(self._equal(cube, np.arange(len(self._cubes))).any())
+
+    def overlap(self, cube):
+        """
+        :return: the first indexed hypercube overlapping the given one and different from it, None if there is none.
+        """
+        candidates = self.overlapping(cube)
+        candidates = candidates[~self._equal(cube, candidates)]
+        return self._cubes[candidates[0]] if len(candidates) > 0 else None
+
+
+class NeighbourIndex:
+    """
+    Nearest-neighbour search over a fixed array of points, of which only the alive ones are searched.
+    Points can be removed and added back without rebuilding the search structure at each change: removed points are
+    only marked as dead in a BallTree, which is rebuilt over the alive points when too many of its points are dead;
+    points added back after the tree was built are searched exhaustively until the next rebuild.
+    """
+
+    def __init__(self, points: np.ndarray, leaf_size: int = 40):
+        """
+        :param points: the points to search (n_points x n_features), all alive at the beginning.
+        :param leaf_size: the leaf size of the underlying BallTree.
+        """
+        self.points = points
+        self.leaf_size = leaf_size
+        self.alive = np.ones(len(points), dtype=bool)
+        self._count = len(points)
+        self._build()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _build(self):
+        self._ids = np.flatnonzero(self.alive)
+        self._tree = BallTree(self.points[self._ids], leaf_size=self.leaf_size) if len(self._ids) > 0 else None
+        self._in_tree = np.zeros(len(self.points), dtype=bool)
+        self._in_tree[self._ids] = True
+        self._dead = 0
+        self._extra = np.array([], dtype=int)
+
+    def remove(self, ids: Iterable[int]) -> None:
+        ids = np.unique(np.asarray(ids, dtype=int))
+        ids = ids[self.alive[ids]]
+        self.alive[ids] = False
+        self._count -= len(ids)
+        self._dead += int(self._in_tree[ids].sum())
+        if self._dead > len(self._ids) // 2:
+            self._build()
+
+    def add(self, ids: Iterable[int]) -> None:
+        ids = np.unique(np.asarray(ids, dtype=int))
+        ids = ids[~self.alive[ids]]
+        self.alive[ids] = True
+        self._count += len(ids)
+        in_tree = self._in_tree[ids]
+        self._dead -= int(in_tree.sum())
+        self._extra = np.concatenate([self._extra[self.alive[self._extra]], ids[~in_tree]])
+        if len(self._extra) > max(self.leaf_size, len(self._ids) // 8):
+            self._build()
+
+    def nearest(self, queries: np.ndarray) -> (np.ndarray, np.ndarray):
+        """
+        :param queries: the query points (n_queries x n_features).
+        :return: the distance and the id of the closest alive point to each query point (inf and -1 if no point is
+            alive).
+        """
+        distances, nearest = np.full(len(queries), np.inf), np.full(len(queries), -1)
+        rows, k = np.arange(len(queries)), 1
+        while self._tree is not None and len(rows) > 0:
+            k = min(k, len(self._ids))
+            d, i = self._tree.query(queries[rows], k=k)
+            ids = self._ids[i]
+            alive = self.alive[ids]
+            found = alive.any(axis=1)
+            first = alive.argmax(axis=1)[found]
+            distances[rows[found]] = d[found, first]
+            nearest[rows[found]] = ids[found, first]
+            if k == len(self._ids):
+                break
+            rows, k = rows[~found], k * 4
+        extra = self._extra[self.alive[self._extra]]
+        if len(extra) > 0:
+            d = np.linalg.norm(queries[:, np.newaxis, :] - self.points[extra][np.newaxis, :, :], axis=2)
+            closer = d.min(axis=1) < distances
+            distances[closer] = d[closer].min(axis=1)
+            nearest[closer] = extra[d[closer].argmin(axis=1)]
+        if k > max(self.leaf_size, len(self._ids) // 16) and self._dead > 0:
+            # the dead points around the queries are many, they will likely be met again by the next queries
+            self._build()
+        return distances, nearest
+
+    def within(self, lower: np.ndarray, upper: np.ndarray) -> np.ndarray:
+        """
+        :return: the ids of the alive points x such that lower <= x < upper.
+        """
+        center, radius = (lower + upper) / 2, np.linalg.norm(upper - lower) / 2
+        ids = self._extra[self.alive[self._extra]]
+        if self._tree is not None:
+            ids = np.concatenate([self._ids[self._tree.query_radius(center[np.newaxis, :], r=radius * (1 + 1e-9))[0]],
+                                  ids])
+        ids = ids[self.alive[ids]]
+        points = self.points[ids]
+        return ids[np.all((lower <= points) & (points < upper), axis=1)]
@@ -6,7 +6,8 @@ from sklearn.base import ClassifierMixin
 from tuprolog.theory import Theory
 from psyke.extraction.hypercubic import HyperCube, HyperCubeExtractor
 from psyke.extraction.hypercubic.hypercube import GenericCube
-from psyke.extraction.hypercubic.utils import MinUpdate, Expansion
+from psyke.extraction.hypercubic.index import OverlapIndex
+from psyke.extraction.hypercubic.utils import MinUpdate, Expansion, SamplePool
 from psyke.utils import get_default_random_seed, Target
 
 
@@ -33,20 +34,21 @@ class ITER(HyperCubeExtractor):
         self.seed = seed
         self.ignore_dimensions = ignore_dimensions if ignore_dimensions is not None else []
 
-    def _best_cube(self, dataframe: pd.DataFrame, cube: GenericCube, cubes: Iterable[Expansion]) -> Expansion | None:
-        expansions = []
-        for limit in cubes:
-            count = limit.cube.count(dataframe)
-            dataframe = pd.concat([dataframe, limit.cube.create_samples(self.min_examples - count)])
-            limit.cube.update(dataframe, self.predictor)
-            expansions.append(Expansion(
-                limit.cube, limit.feature, limit.direction,
-                abs(cube.output - limit.cube.output) if self._output is Target.CONSTANT else
-                1 - int(cube.output == limit.cube.output)
-            ))
-        if len(expansions) > 0:
-            return sorted(expansions, key=lambda e: e.distance)[0]
-        return None
+    def _evaluate_expansion(self, dataframe: SamplePool, cube: GenericCube, limit: Expansion) -> (Expansion, bool):
+        """
+        :return: the evaluated expansion and whether synthetic samples were needed to evaluate it.
+        """
+        # the samples generated here are only used to evaluate the expansion
+        size = len(dataframe)
+        count = limit.cube.count(dataframe)
+        dataframe.append(self._oracle.label(limit.cube.create_samples(self.min_examples - count), dataframe.target))
+        limit.cube.update(dataframe, self._oracle)
+        dataframe.truncate(size)
+        return Expansion(
+            limit.cube, limit.feature, limit.direction,
+            abs(cube.output - limit.cube.output) if self._output is Target.CONSTANT else
+            1 - int(cube.output == limit.cube.output)
+        ), count < self.min_examples
 
     def _calculate_min_updates(self) -> Iterable[MinUpdate]:
         return [MinUpdate(name, (interval[1] - interval[0]) * self.min_update) for (name, interval) in
@@ -60,21 +62,19 @@ class ITER(HyperCubeExtractor):
                 if direction == '-' else (b, min(b + size, self._surrounding.get_second(feature))))
 
     def _create_temp_cube(self, cube: GenericCube, min_updates: Iterable[MinUpdate],
-                          hypercubes: Iterable[GenericCube], feature: str,
+                          hypercubes: OverlapIndex, feature: str,
                           direction: str) -> Iterable[Expansion]:
         temp_cube, values = self._create_range(cube, min_updates, feature, direction)
         temp_cube.update_dimension(feature, values)
         overlap = temp_cube.overlap(hypercubes)
         while (overlap is not None) & (temp_cube.has_volume()):
             overlap = ITER._resolve_overlap(temp_cube, overlap, hypercubes, feature, direction)
-        if (temp_cube.has_volume() & (overlap is None)) & (all(temp_cube != cube for cube in hypercubes)):
+        if (temp_cube.has_volume() & (overlap is None)) & (not hypercubes.equal(temp_cube)):
             yield Expansion(temp_cube, feature, direction)
         else:
             cube.add_limit(feature, direction)
 
-    def _create_temp_cubes(self, cube: GenericCube, min_updates: Iterable[MinUpdate],
-                           hypercubes: Iterable[GenericCube]) -> Iterable[Expansion]:
-        tmp_cubes = []
+    def _directions(self, cube: GenericCube) -> Iterable[tuple[str, str]]:
         for feature in self._surrounding.dimensions.keys():
             if feature in self.ignore_dimensions:
                 continue
@@ -82,21 +82,64 @@ class ITER(HyperCubeExtractor):
             if limit == '*':
                 continue
             for x in {'-', '+'} - {limit}:
-                tmp_cubes += self._create_temp_cube(cube, min_updates, hypercubes, feature, x)
-        return tmp_cubes
+                yield feature, x
 
-    def _cubes_to_update(self, dataframe: pd.DataFrame, to_expand: Iterable[GenericCube],
-                         hypercubes: Iterable[GenericCube], min_updates: Iterable[MinUpdate]) \
+    def _cubes_to_update(self, dataframe: SamplePool, to_expand: Iterable[GenericCube],
+                         hypercubes: OverlapIndex, min_updates: Iterable[MinUpdate],
+                         expansions: dict[tuple[int, str, str], list]) \
             -> Iterable[tuple[GenericCube, Expansion]]:
-        results = [(hypercube, self._best_cube(dataframe, hypercube, self._create_temp_cubes(
-            hypercube, min_updates, hypercubes))) for hypercube in to_expand]
+        """
+        :param expansions: for each cube, feature and direction, the region where the expansion is looked for, the
+            expansion (None if not possible) and its evaluation. The expansions missing from the cache are created.
+            Evaluations are cached only if they do not depend on synthetic samples, otherwise they are repeated.
+        """
+        results = []
+        for hypercube in to_expand:
+            candidates = []
+            for feature, direction in list(self._directions(hypercube)):
+                key = (id(hypercube), feature, direction)
+                if key not in expansions:
+                    region, values = self._create_range(hypercube, min_updates, feature, direction)
+                    region.update_dimension(feature, values)
+                    expansion = next(iter(self._create_temp_cube(hypercube, min_updates, hypercubes, feature,
+                                                                 direction)), None)
+                    expansions[key] = [region, expansion, None]
+                _, expansion, evaluated = expansions[key]
+                if expansion is None:
+                    continue
+                if evaluated is None:
+                    evaluated, sampled = self._evaluate_expansion(dataframe, hypercube, expansion)
+                    if not sampled:
+                        expansions[key][2] = evaluated
+                candidates.append(evaluated)
+            results.append((hypercube, sorted(candidates, key=lambda e: e.distance)[0] if candidates else None))
         return sorted([result for result in results if result[1] is not None], key=lambda x: x[1].distance)
 
-    def _expand_or_create(self, cube: GenericCube, expansion: Expansion, hypercubes: Iterable[GenericCube]) -> None:
+    @staticmethod
+    def _invalidate_expansions(expansions: dict[tuple[int, str, str], list],
+                               changed: GenericCube, expanded: bool):
+        """
+        Removes the cached expansions that may be affected by a change of the given cube, i.e., the expansions of the
+        cube itself (if it was expanded) and the ones looked for in a region touching it.
+        """
+        for key, (region, _, _) in list(expansions.items()):
+            if (expanded and key[0] == id(changed)) or all(
+                    a1 <= b2 and a2 <= b1 for (a1, b1), (a2, b2) in
+                    zip(region.dimensions.values(), (changed[f] for f in region.dimensions))):
+                del expansions[key]
+
+    def _expand_or_create(self, cube: GenericCube, expansion: Expansion, hypercubes: list[GenericCube],
+                          index: OverlapIndex) -> bool:
+        """
+        :return: True if the cube was expanded, False if a new cube was created.
+        """
         if expansion.distance > self.threshold:
             hypercubes += [expansion.cube]
-        else:
-            cube.expand(expansion, hypercubes)
+            index.add(expansion.cube)
+            return False
+        cube.expand(expansion, index)
+        index.update(cube)
+        return True
 
     @staticmethod
     def _find_closer_sample(dataframe: pd.DataFrame, output: float | str) -> dict[str, float]:
@@ -128,7 +171,7 @@ class ITER(HyperCubeExtractor):
         min_updates = self._calculate_min_updates()
         self._init_hypercubes(dataframe, min_updates)
         for hypercube in self._hypercubes:
-            hypercube.update(dataframe, self.predictor)
+            hypercube.update(dataframe, self._oracle)
         return min_updates
 
     def _init_hypercubes(self, dataframe: pd.DataFrame, min_updates: Iterable[MinUpdate]):
@@ -143,48 +186,75 @@ class ITER(HyperCubeExtractor):
                 break
         self._hypercubes = hypercubes
 
-    def _iterate(self, dataframe: pd.DataFrame, hypercubes: Iterable[GenericCube], min_updates: Iterable[MinUpdate],
-                 left_iteration: int) -> int:
+    def _iterate(self, dataframe: SamplePool, hypercubes: list[GenericCube], min_updates: Iterable[MinUpdate],
+                 left_iteration: int, changed: list[GenericCube] = None) -> int:
+        """
+        :param changed: if given, the hypercubes created or expanded are appended to it.
+        """
         np.random.seed(self.seed)
         iterations = 0
         to_expand = [cube for cube in hypercubes if cube.limit_count < (len(dataframe.columns) - 1) * 2]
+        expansions, index = {}, OverlapIndex(hypercubes)
         while (len(to_expand) > 0) and (iterations < left_iteration):
-            updates = list(self._cubes_to_update(dataframe, to_expand, hypercubes, min_updates))
+            updates = list(self._cubes_to_update(dataframe, to_expand, index, min_updates, expansions))
             if len(updates) > 0:
-                self._expand_or_create(updates[0][0], updates[0][1], hypercubes)
+                cube, expansion = updates[0]
+                expanded = self._expand_or_create(cube, expansion, hypercubes, index)
+                ITER._invalidate_expansions(expansions, cube if expanded else expansion.cube, expanded)
+                if changed is not None:
+                    changed.append(cube if expanded else expansion.cube)
             iterations += 1
             to_expand = [cube for cube in hypercubes if cube.limit_count < (len(dataframe.columns) - 1) * 2]
         return iterations
 
     @staticmethod
-    def _resolve_overlap(cube: GenericCube, overlapping_cube: GenericCube, hypercubes: Iterable[GenericCube],
+    def _resolve_overlap(cube: GenericCube, overlapping_cube: GenericCube, hypercubes: OverlapIndex,
                          feature: str, direction: str) -> GenericCube:
         a, b = cube[feature]
         cube.update_dimension(feature, max(overlapping_cube.get_second(feature), a) if direction == '-' else a,
                               min(overlapping_cube.get_first(feature), b) if direction == '+' else b)
         return cube.overlap(hypercubes)
 
+    @staticmethod
+    def _update_coverage(covered: np.ndarray, data: np.ndarray, hypercubes: Iterable[GenericCube]) -> None:
+        """
+        Marks as covered the rows of data inside the given hypercubes. Only the rows not yet covered are checked,
+        since hypercubes are never shrunk while extracting.
+        """
+        for cube in hypercubes:
+            uncovered = np.flatnonzero(~covered)
+            covered[uncovered] = cube.filter_indices(data[uncovered])
+
     def _extract(self, dataframe: pd.DataFrame) -> Theory:
         min_updates = self._initialize(dataframe)
-        temp_train = dataframe.copy()
-        fake = dataframe.copy()
+        data = dataframe.iloc[:, :-1].to_numpy(dtype=float)
+        # rows still to be covered and rows covered by the hypercubes, updated with the hypercubes that changed
+        remaining, covered = np.ones(len(dataframe), dtype=bool), np.zeros(len(dataframe), dtype=bool)
+        changed = list(self._hypercubes)
+        fake = SamplePool(dataframe)
         iterations = 0
-        while temp_train.shape[0] > 0:
-            iterations += self._iterate(fake, self._hypercubes, min_updates, self.max_iterations - iterations)
+        while remaining.any():
+            iterations += self._iterate(fake, self._hypercubes, min_updates, self.max_iterations - iterations,
+                                        changed)
             if (iterations >= self.max_iterations) or (not self.fill_gaps):
                 break
-            temp_train = temp_train.iloc[[p is None for p in self.predict(temp_train.iloc[:, :-1])]]
-            if temp_train.shape[0] > 0:
-                point, ratio, overlap, new_cube = temp_train.iloc[0].to_dict(), 1.0, True, None
-                temp_train = temp_train.drop([temp_train.index[0]])
+            ITER._update_coverage(covered, data, changed)
+            changed = []
+            remaining &= ~covered
+            if remaining.any():
+                first = int(np.argmax(remaining))
+                point, ratio, overlap, new_cube = dataframe.iloc[first].to_dict(), 1.0, True, None
+                index = OverlapIndex(self._hypercubes)
+                remaining[first] = False
                 while overlap is not None:
                     if new_cube is not None:
                         if not new_cube.has_volume():
                             break
                     new_cube = HyperCube.cube_from_point(point, self._output)
                     new_cube.expand_all(min_updates, self._surrounding, ratio)
-                    overlap = new_cube.overlap(self._hypercubes)
+                    overlap = new_cube.overlap(index)
                     ratio *= 2
                 if new_cube.has_volume():
                     self._hypercubes += [new_cube]
+                    changed.append(new_cube)
         return self._create_theory(dataframe)
@@ -2,6 +2,11 @@ from __future__ import annotations
 import math
 import warnings
 
+import numpy as np
+import pandas as pd
+
+from psyke.utils import Target, get_default_precision
+
 warnings.simplefilter("ignore")
 
 Dimension = tuple[float, float]
@@ -54,3 +59,241 @@ class ZippedDimension:
         return (self.name == other.name) and (self.this_dimension == other.this_dimension) and \
                (self.other_dimension == other.other_dimension)
 
+
+class Oracle:
+    """
+    Labels samples with the predictions of a black-box predictor once, so that the labels can be stored along with
+    the samples (as last column) and read by the hypercubes instead of querying the predictor again.
+    """
+
+    def __init__(self, predictor, batch_size: int = None):
+        """
+        :param predictor: the black-box predictor.
+        :param batch_size: the maximum number of samples given to the predictor at once, unlimited if None.
+        """
+        self.predictor = predictor
+        self.batch_size = batch_size
+
+    def predict(self, dataframe: pd.DataFrame) -> np.ndarray:
+        if self.batch_size is None or len(dataframe) <= self.batch_size:
+            return np.asarray(self.predictor.predict(dataframe)).flatten()
+        return np.concatenate([np.asarray(self.predictor.predict(dataframe.iloc[i:i + self.batch_size])).flatten()
+                               for i in range(0, len(dataframe), self.batch_size)])
+
+    def label(self, samples: pd.DataFrame, target: str) -> pd.DataFrame:
+        """
+        :param samples: the samples to label.
+        :param target: the name of the label column.
+        :return: the samples with their labels as last column.
+        """
+        if len(samples) == 0:
+            return samples
+        labelled = samples.copy()
+        labelled[target] = self.predict(samples)
+        return labelled
+
+
+class SamplePool:
+    """
+    A growing collection of labelled samples, stored in preallocated NumPy buffers whose capacity grows
+    geometrically, so that appending samples takes amortised constant time.
+    The samples can be accessed through views of the buffers, without copying them.
+    Labels can also be read as integer codes, assigned to the classes in order of appearance.
+    """
+
+    GROWTH = 2
+
+    def __init__(self, dataframe: pd.DataFrame, capacity: int = 0):
+        """
+        :param dataframe: the initial samples, with their labels as last column.
+        :param capacity: the initial capacity of the pool.
+        """
+        self.features = list(dataframe.columns[:-1])
+        self.target = dataframe.columns[-1]
+        self._size = len(dataframe)
+        capacity = max(capacity, self._size, 1)
+        self._x = np.empty((capacity, len(self.features)))
+        self._x[:self._size] = dataframe.iloc[:, :-1].to_numpy(dtype=float)
+        labels = SamplePool._labels(dataframe.iloc[:, -1].to_numpy())
+        self._y = np.empty(capacity, dtype=labels.dtype)
+        self._y[:self._size] = labels
+        self._codes = np.empty(capacity, dtype=int)
+        self._encoded = 0
+        self._classes: dict = {}
+
+    @staticmethod
+    def _labels(labels: np.ndarray) -> np.ndarray:
+        return labels.astype(object) if labels.dtype.kind in 'US' else labels
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, mask: np.ndarray) -> SamplePool:
+        subset = SamplePool.__new__(SamplePool)
+        subset.features, subset.target = self.features, self.target
+        subset._x, subset._y = self.x[mask], self.y[mask]
+        subset._size = len(subset._x)
+        if self._encoded == self._size:
+            subset._codes, subset._encoded = self.codes[mask], subset._size
+        else:
+            subset._codes, subset._encoded = np.empty(subset._size, dtype=int), 0
+        subset._classes = dict(self._classes)
+        return subset
+
+    @property
+    def columns(self) -> list[str]:
+        return self.features + [self.target]
+
+    @property
+    def x(self) -> np.ndarray:
+        """
+        A view of the features of the samples (n_samples x n_features).
+        """
+        return self._x[:self._size]
+
+    @property
+    def y(self) -> np.ndarray:
+        """
+        A view of the labels of the samples.
+        """
+        return self._y[:self._size]
+
+    def _encode(self):
+        if self._encoded < self._size:
+            codes, classes = pd.factorize(self._y[self._encoded:self._size])
+            codes = np.array([self._classes.setdefault(c, len(self._classes)) for c in classes], dtype=int)[codes]
+            self._codes[self._encoded:self._size] = codes
+            self._encoded = self._size
+
+    @property
+    def codes(self) -> np.ndarray:
+        """
+        A view of the labels of the samples, as integer codes.
+        """
+        self._encode()
+        return self._codes[:self._size]
+
+    @property
+    def classes(self) -> list:
+        """
+        The labels of the samples, by code.
+        """
+        self._encode()
+        return list(self._classes.keys())
+
+    def _reserve(self, capacity: int):
+        if capacity > len(self._x):
+            capacity = max(capacity, len(self._x) * SamplePool.GROWTH)
+            x, y = np.empty((capacity, self._x.shape[1])), np.empty(capacity, dtype=self._y.dtype)
+            codes = np.empty(capacity, dtype=int)
+            x[:self._size], y[:self._size], codes[:self._encoded] = self.x, self.y, self._codes[:self._encoded]
+            self._x, self._y, self._codes = x, y, codes
+
+    def append(self, samples: pd.DataFrame):
+        """
+        :param samples: the samples to append, with their labels as last column.
+        """
+        if len(samples) == 0:
+            return
+        labels = SamplePool._labels(samples.iloc[:, -1].to_numpy())
+        if labels.dtype != self._y.dtype:
+            self._y = self._y.astype(np.result_type(self._y.dtype, labels.dtype))
+        self._reserve(self._size + len(samples))
+        self._x[self._size:self._size + len(samples)] = samples[self.features].to_numpy(dtype=float)
+        self._y[self._size:self._size + len(samples)] = labels
+        self._size += len(samples)
+
+    def truncate(self, size: int):
+        """
+        Discards the samples appended after the pool reached the given size.
+        """
+        self._size = min(size, self._size)
+        self._encoded = min(self._encoded, self._size)
+
+    def to_dataframe(self) -> pd.DataFrame:
+        dataframe = pd.DataFrame(self.x, columns=self.features)
+        dataframe[self.target] = self.y
+        return dataframe
+
+
+class CubeStatistics:
+    """
+    Sufficient statistics of the samples inside a hypercube. The statistics of disjoint hypercubes can be summed to
+    obtain the statistics of their union without accessing the samples again.
+    """
+
+    def __init__(self, n: int, mean: float, m2: float, x_sum: np.ndarray, xtx: np.ndarray = None,
+                 xty: np.ndarray = None, counts: dict = None):
+        """
+        :param n: the number of samples.
+        :param mean: the mean of the labels (numeric labels only).
+        :param m2: the sum of squared deviations of the labels from their mean (numeric labels only).
+        :param x_sum: the sum of the samples, feature by feature.
+        :param xtx: the Gram matrix of the samples with an intercept column (regression only).
+        :param xty: the product of the samples with an intercept column and the labels (regression only).
+        :param counts: the number of samples of each label code (classification only).
+        """
+        self.n = n
+        self.mean = mean
+        self.m2 = m2
+        self.x_sum = x_sum
+        self.xtx = xtx
+        self.xty = xty
+        self.counts = counts
+
+    @staticmethod
+    def from_samples(x: np.ndarray, y: np.ndarray, output: Target) -> CubeStatistics:
+        """
+        :param x: the samples (n_samples x n_features).
+        :param y: the labels of the samples, as integer codes for classification.
+        :param output: the kind of output of the hypercube.
+        """
+        if output == Target.CLASSIFICATION:
+            return CubeStatistics(len(y), math.nan, math.nan, x.sum(axis=0), counts=np.bincount(y))
+        y = y.astype(float)
+        mean = y.mean() if len(y) > 0 else 0.
+        statistics = CubeStatistics(len(y), mean, ((y - mean) ** 2).sum(), x.sum(axis=0))
+        if output == Target.REGRESSION:
+            a = np.column_stack([np.ones(len(x)), x])
+            statistics.xtx, statistics.xty = a.T @ a, a.T @ y
+        return statistics
+
+    def __add__(self, other: CubeStatistics) -> CubeStatistics:
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        counts = None
+        if self.counts is not None:
+            counts = np.zeros(max(len(self.counts), len(other.counts)), dtype=int)
+            counts[:len(self.counts)] += self.counts
+            counts[:len(other.counts)] += other.counts
+        return CubeStatistics(n, self.mean + delta * other.n / n if n > 0 else 0.,
+                              self.m2 + other.m2 + delta ** 2 * self.n * other.n / n if n > 0 else 0.,
+                              self.x_sum + other.x_sum, None if self.xtx is None else self.xtx + other.xtx,
+                              None if self.xty is None else self.xty + other.xty, counts)
+
+    @property
+    def std(self) -> float:
+        if self.n == 0:
+            return math.nan
+        # summing the statistics of samples with the same label leaves rounding errors in m2, so deviations that
+        # are negligible with respect to the labels are treated as zero
+        if self.m2 <= (get_default_precision() * self.mean) ** 2 * self.n:
+            return 0.
+        return math.sqrt(self.m2 / self.n)
+
+    @property
+    def barycenter(self) -> np.ndarray:
+        return self.x_sum / self.n
+
+    @property
+    def misclassification(self) -> float:
+        """
+        The fraction of samples whose label is not the most frequent one.
+        """
+        return 1 - self.counts.max() / self.n if self.n > 0 else math.nan
+
+    def least_squares(self) -> np.ndarray:
+        """
+        :return: the intercept and the coefficients of the (minimum norm) least squares linear model of the samples.
+        """
+        return np.linalg.lstsq(self.xtx, self.xty, rcond=None)[0]
@@ -7,19 +7,165 @@ import pandas as pd
 from sklearn.neighbors import BallTree
 
 from psyke import EvaluableModel, Target, get_int_precision
-from psyke.extraction.hypercubic import RegressionCube, GenericCube, Point
+from psyke.extraction.hypercubic import RegressionCube, GenericCube
+from psyke.extraction.hypercubic.hypercubeset import HyperCubeSet
+from psyke.extraction.hypercubic.index import HyperCubeIndex
+from psyke.utils import get_default_chunk_size
 
 
 class HyperCubePredictor(EvaluableModel):
     def __init__(self, output=Target.CONSTANT, discretization=None, normalization=None):
         super().__init__(discretization, normalization)
+        self._cache = {}
         self._hypercubes = []
         self._dimensions_to_ignore = set()
         self._output = output
         self._surrounding = None
+        self.chunk_size = get_default_chunk_size()
+
+    @property
+    def _hypercubes(self) -> list[GenericCube] | HyperCubeSet:
+        return self._cubes
+
+    @_hypercubes.setter
+    def _hypercubes(self, hypercubes: list[GenericCube] | HyperCubeSet):
+        self._cubes = hypercubes
+        self._invalidate_cache()
+
+    def pack(self):
+        """
+        Replaces the hypercubes of this predictor with a HyperCubeSet holding them, which is smaller to keep in
+        memory and to serialise. Single hypercubes can still be accessed, but they are no longer shared objects.
+        """
+        self._hypercubes = self._cube_set()
+
+    def _cube_set(self) -> HyperCubeSet:
+        """
+        :return: the hypercubes of this predictor packed into a HyperCubeSet.
+        """
+        if isinstance(self._hypercubes, HyperCubeSet):
+            return self._hypercubes
+        if 'set' not in self._cache:
+            self._cache['set'] = HyperCubeSet.from_cubes(self._hypercubes)
+        return self._cache['set']
+
+    def _invalidate_cache(self):
+        """
+        Discards the structures built from the hypercubes. It must be called after modifying hypercubes in place.
+        """
+        self._cache = {}
+        self._invalidate_sessions()
 
     def _predict(self, dataframe: pd.DataFrame) -> Iterable:
-        return np.array([self._predict_from_cubes(row.to_dict()) for _, row in dataframe.iterrows()])
+        return self._predict_from_indices(dataframe, self._find_cube_indices(dataframe))
+
+    def _predict_masked(self, dataframe: pd.DataFrame) -> (np.ndarray | pd.Categorical, np.ndarray):
+        indices = self._find_cube_indices(dataframe)
+        mask = indices >= 0
+        outputs, regression = self._cube_outputs()
+        # index -1 (no hypercube) selects the trailing missing value
+        if self._output == Target.CLASSIFICATION:
+            classes = pd.Categorical(outputs)
+            return pd.Categorical.from_codes(np.append(classes.codes, -1)[indices], classes.categories), mask
+        values = np.append(np.asarray(outputs, dtype=float), np.nan)[indices]
+        linear = regression[np.where(mask, indices, 0)] & mask
+        if linear.any():
+            values[linear] = np.round(self._regression_outputs(dataframe[linear], indices[linear]), get_int_precision())
+        return values, mask
+
+    def _cube_bounds(self, features: list[str]) -> (np.ndarray, np.ndarray, np.ndarray):
+        """
+        Packs the bounds of all the hypercubes into matrices.
+
+        :param features: the features (columns) of the matrices.
+        :return: the lower bounds and upper bounds (n_cubes x n_features) and whether each cube is closed.
+        """
+        cubes = self._cube_set()
+        return *cubes.intervals(features), cubes.closed
+
+    def _cube_index(self, features: list[str]) -> HyperCubeIndex:
+        key = ('index', tuple(features))
+        if key not in self._cache:
+            self._cache[key] = HyperCubeIndex(*self._cube_bounds(features))
+        return self._cache[key]
+
+    def _find_cube_indices(self, dataframe: pd.DataFrame) -> np.ndarray:
+        """
+        Finds the first hypercube containing each row of the dataframe.
+
+        :param dataframe: the instances to locate.
+        :return: the index of the hypercube for each instance, -1 if no hypercube contains it.
+        """
+        features = [feature for feature in dataframe.columns if feature not in self._dimensions_to_ignore]
+        index = self._cube_index(features)
+        data = dataframe[features].to_numpy(dtype=float)
+        indices = np.full(len(data), -1)
+        step = max(1, self.chunk_size // (index.leaf_size * max(1, len(features))))
+        for start in range(0, len(data), step):
+            indices[start:start + step] = index.query(data[start:start + step])
+        if self._has_default():
+            indices[indices < 0] = len(self._hypercubes) - 1
+        return indices
+
+    def _has_default(self) -> bool:
+        return len(self._hypercubes) > 0 and bool(self._cube_set().default[-1])
+
+    def _cube_outputs(self) -> (list, np.ndarray):
+        """
+        :return: the (rounded, if numeric) constant output of each hypercube and whether each hypercube is a
+            regression one.
+        """
+        if 'outputs' not in self._cache:
+            cubes = self._cube_set()
+            outputs = [str(output) if isinstance(output, str) else output for output in cubes.outputs]
+            if self._output != Target.CLASSIFICATION:
+                outputs = [round(output, get_int_precision()) for output in outputs]
+            self._cache['outputs'] = outputs, cubes.regression
+        return self._cache['outputs']
+
+    def _predict_from_indices(self, dataframe: pd.DataFrame, indices: np.ndarray) -> np.ndarray:
+        covered = indices >= 0
+        outputs, regression = self._cube_outputs()
+        cube_outputs = np.empty(len(outputs), dtype=object)
+        cube_outputs[:] = outputs
+        values = np.empty(len(indices), dtype=object)
+        values[covered] = cube_outputs[indices[covered]]
+        if regression.any():
+            linear = regression[np.where(covered, indices, 0)] & covered
+            values[linear] = np.round(self._regression_outputs(dataframe[linear], indices[linear]), get_int_precision())
+        if not covered.all():
+            return values
+        return values.astype(float) if regression.any() else np.array(outputs)[indices]
+
+    def _cube_coefficients(self, n_features: int) -> (np.ndarray, np.ndarray):
+        """
+        Stacks the linear models of the regression hypercubes into a single matrix.
+
+        :param n_features: the number of input features.
+        :return: the intercepts and coefficients (n_cubes x n_features + 1) and whether each model is fitted.
+        """
+        coefficients = self._cube_set().coefficients
+        if coefficients.shape[1] != n_features + 1:
+            coefficients = np.full((len(coefficients), n_features + 1), np.nan)
+        return coefficients, ~np.isnan(coefficients[:, 0])
+
+    def _regression_outputs(self, dataframe: pd.DataFrame, indices: np.ndarray) -> np.ndarray:
+        """
+        Computes the outputs of the regression hypercubes for a batch of instances.
+
+        :param dataframe: the instances.
+        :param indices: the index of the regression hypercube covering each instance.
+        :return: the output of the linear model of the corresponding hypercube for each instance.
+        """
+        data = dataframe.to_numpy(dtype=float)
+        coefficients, fitted = self._cube_coefficients(data.shape[1])
+        gathered = coefficients[indices]
+        outputs = gathered[:, 0] + np.einsum('ij,ij->i', gathered[:, 1:], data)
+        # models that cannot be stacked (e.g., not fitted) are left to sklearn
+        for i in np.unique(indices[~fitted[indices]]):
+            rows = indices == i
+            outputs[rows] = self._hypercubes[i].output.predict(dataframe[rows]).flatten()
+        return outputs
 
     def _brute_predict(self, dataframe: pd.DataFrame, criterion: str = 'corner', n: int = 2) -> Iterable:
         predictions = np.array(self._predict(dataframe))
@@ -30,41 +176,83 @@ class HyperCubePredictor(EvaluableModel):
                     self._surrounding, row
                 ) for _, row in dataframe[idx].iterrows()])
             elif criterion == 'surface':
-                predictions[idx] = np.array([HyperCubePredictor._get_cube_output(self._brute_predict_surface(row), row)
-                                             for _, row in dataframe[idx].iterrows()])
+                uncovered = dataframe[idx]
+                predictions[idx] = self._get_cube_outputs(uncovered, self._brute_predict_surface(uncovered))
             else:
-                tree, cubes = self._create_brute_tree(criterion, n)
-                predictions[idx] = np.array([HyperCubePredictor._brute_predict_from_cubes(
-                    row.to_dict(), tree, cubes
-                ) for _, row in dataframe[idx].iterrows()])
+                tree, cubes = self._create_brute_tree(criterion, n, list(dataframe.columns))
+                uncovered = dataframe[idx]
+                nearest = tree.query(uncovered.to_numpy(dtype=float), k=1, return_distance=False)[:, 0]
+                predictions[idx] = self._get_cube_outputs(uncovered, cubes[nearest])
         return np.array(predictions)
 
-    @staticmethod
-    def _brute_predict_from_cubes(row: dict[str, float], tree: BallTree,
-                                  cubes: list[GenericCube]) -> float | str:
-        idx = tree.query([list(row.values())], k=1)[1][0][0]
-        return HyperCubePredictor._get_cube_output(cubes[idx], row)
+    def _get_cube_outputs(self, dataframe: pd.DataFrame, indices: np.ndarray) -> np.ndarray:
+        """
+        :param dataframe: the instances.
+        :param indices: the index of the hypercube assigned to each instance.
+        :return: the (not rounded) output of the corresponding hypercube for each instance.
+        """
+        cubes = self._cube_set()
+        outputs = np.empty(len(indices), dtype=object)
+        regression = cubes.regression[indices]
+        outputs[~regression] = [str(output) if isinstance(output, str) else output
+                                for output in cubes.outputs[indices[~regression]]]
+        if regression.any():
+            outputs[regression] = self._regression_outputs(dataframe[regression], indices[regression])
+        return outputs
+
+    def _brute_predict_surface(self, dataframe: pd.DataFrame) -> np.ndarray:
+        """
+        Finds the hypercube with the closest surface to each row of the dataframe.
+        Ties are broken by preferring the hypercube with the smallest volume, then the first one.
 
-    def _brute_predict_surface(self, row: dict[str, float]) -> GenericCube:
-        return min([(
-            cube.surface_distance(Point(list(row.keys()), list(row.values()))), cube.volume(), cube
-        ) for cube in self._hypercubes])[-1]
+        :param dataframe: the instances.
+        :return: the index of the closest hypercube for each instance.
+        """
+        features = list(dataframe.columns)
+        key = ('surface', tuple(features))
+        if key not in self._cache:
+            cubes = self._cube_set()
+            order = np.argsort(cubes.volumes(), kind='stable')
+            columns = cubes.columns(features)
+            self._cache[key] = cubes.lower[order][:, columns], cubes.upper[order][:, columns], order
+        lower, upper, order = self._cache[key]
+        data = dataframe.to_numpy(dtype=float)
+        indices = np.empty(len(data), dtype=int)
+        step = max(1, self.chunk_size // max(1, len(order) * len(features)))
+        for start in range(0, len(data), step):
+            points = data[start:start + step, np.newaxis, :]
+            gaps = np.maximum(lower - points, 0) + np.maximum(points - upper, 0)
+            indices[start:start + step] = order[np.argmin(np.sqrt(np.sum(gaps ** 2, axis=2)), axis=1)]
+        return indices
 
-    def _create_brute_tree(self, criterion: str = 'center', n: int = 2) -> (BallTree, list[GenericCube]):
+    def _create_brute_tree(self, criterion: str = 'center', n: int = 2,
+                           features: list[str] = None) -> (BallTree, np.ndarray):
+        """
+        Builds (or retrieves from the cache) the tree of the representative points of the hypercubes.
+
+        :param criterion: the criterion used to select the representative points.
+        :param n: the number of samples per side, for the 'perimeter' criterion.
+        :param features: the features (columns) of the points, defaults to the hypercube dimensions.
+        :return: the tree and the index of the hypercube of each point.
+        """
         admissible_criteria = ['surface', 'center', 'corner', 'perimeter', 'density', 'default']
         if criterion not in admissible_criteria:
             raise NotImplementedError(
                 "'criterion' should be chosen in " + str(admissible_criteria)
             )
-
-        points = [(cube.center, cube) for cube in self._hypercubes] if criterion == 'center' else \
-            [(cube.barycenter, cube) for cube in self._hypercubes] if criterion == 'density' else \
-            [(corner, cube) for cube in self._hypercubes for corner in cube.corners()] if criterion == 'corner' else \
-            [(point, cube) for cube in self._hypercubes for point in cube.perimeter_samples(n)] \
-            if criterion == 'perimeter' else None
-
-        return BallTree(pd.concat([point[0].to_dataframe() for point in points], ignore_index=True)), \
-            [point[1] for point in points]
+        if features is None:
+            features = list(self._hypercubes[0].dimensions.keys())
+        key = ('brute', criterion, n, tuple(features))
+        if key not in self._cache:
+            points = [(cube.center, i) for i, cube in enumerate(self._hypercubes)] if criterion == 'center' else \
+                [(cube.barycenter, i) for i, cube in enumerate(self._hypercubes)] if criterion == 'density' else \
+                [(corner, i) for i, cube in enumerate(self._hypercubes) for corner in cube.corners()] \
+                if criterion == 'corner' else \
+                [(point, i) for i, cube in enumerate(self._hypercubes) for point in cube.perimeter_samples(n)] \
+                if criterion == 'perimeter' else None
+            self._cache[key] = BallTree(np.array([[point[feature] for feature in features] for point, _ in points],
+                                                 dtype=float)), np.array([i for _, i in points], dtype=int)
+        return self._cache[key]
 
     def _predict_from_cubes(self, data: dict[str, float]) -> float | str | None:
         cube = self._find_cube(data)
@@ -76,14 +264,11 @@ class HyperCubePredictor(EvaluableModel):
             return round(HyperCubePredictor._get_cube_output(cube, data), get_int_precision())
 
     def _find_cube(self, data: dict[str, float]) -> GenericCube | None:
-        data = data.copy()
-        for dimension in self._dimensions_to_ignore:
-            if dimension in data:
-                del data[dimension]
-        for cube in self._hypercubes:
-            if data in cube:
-                return cube.copy()
-        if self._hypercubes[-1].is_default:
+        features = [feature for feature in data if feature not in self._dimensions_to_ignore]
+        index = self._cube_index(features).query(np.array([[data[feature] for feature in features]], dtype=float))[0]
+        if index >= 0:
+            return self._hypercubes[index].copy()
+        if self._has_default():
             return self._hypercubes[-1].copy()
 
     @property
@@ -14,6 +14,16 @@ _DEFAULT_PRECISION: float = 1e-6
 
 _precision_options: dict = {'precision': _DEFAULT_PRECISION}
 
+_DEFAULT_CHUNK_SIZE: int = 1 << 22
+
+_DEFAULT_BATCH_SIZE: int = 1 << 16
+
+_chunk_options: dict = {'chunk_size': _DEFAULT_CHUNK_SIZE, 'batch_size': _DEFAULT_BATCH_SIZE}
+
+_DEFAULT_N_JOBS: int = 4
+
+_parallel_options: dict = {'n_jobs': _DEFAULT_N_JOBS}
+
 
 class TypeNotAllowedException(Exception):
 
@@ -72,6 +82,30 @@ def set_default_precision(value: float):
     _precision_options['precision'] = value
 
 
+def get_default_chunk_size() -> int:
+    return _chunk_options['chunk_size']
+
+
+def set_default_chunk_size(value: int):
+    _chunk_options['chunk_size'] = value
+
+
+def get_default_batch_size() -> int:
+    return _chunk_options['batch_size']
+
+
+def set_default_batch_size(value: int):
+    _chunk_options['batch_size'] = value
+
+
+def get_default_n_jobs() -> int:
+    return _parallel_options['n_jobs']
+
+
+def set_default_n_jobs(value: int):
+    _parallel_options['n_jobs'] = value
+
+
 class Target(Enum):
     CLASSIFICATION = 1,
     CONSTANT = 2,
@@ -1,5 +1,8 @@
 from functools import partial
 
+import numpy as np
+import pandas as pd
+
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score, accuracy_score, f1_score
 
 
@@ -63,9 +66,11 @@ def score(expected, predicted, scoring_function):
     Calculates the predictions' score w.r.t. the instances given as input with the provided scoring function.
 
     :param expected: the expected data .
-    :param predicted: the predicted data.
+    :param predicted: the predicted data, None or NaN for the instances that cannot be predicted.
     :param scoring_function: the scoring function to be used.
     :return: the score of the predictions.
     """
-    idx = [prediction is not None for prediction in predicted]
-    return scoring_function(expected[idx], predicted[idx])
+    if not isinstance(predicted, pd.Categorical):
+        predicted = np.asarray(predicted)
+    idx = pd.notna(predicted)
+    return scoring_function(np.asarray(expected)[idx], np.asarray(predicted[idx]))
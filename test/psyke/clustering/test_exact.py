@@ -0,0 +1,55 @@
+import unittest
+import numpy as np
+import pandas as pd
+
+from psyke import Target
+from psyke.clustering.exact import ExACT
+from psyke.extraction.hypercubic import Node, HyperCube
+
+
+class TestNode(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.data = pd.DataFrame(rng.uniform(0, 1, (50, 2)), columns=['X', 'Y'])
+        self.data['Z'] = np.where(self.data.X > .5, 'a', 'b')
+        self.cube = HyperCube.create_surrounding_cube(self.data, True)
+
+    def test_split(self):
+        root = Node(self.data, self.cube, np.arange(len(self.data)))
+        mask = (self.data.Y > .3).to_numpy()
+        root.split(mask, self.cube.copy(), self.cube)
+        pd.testing.assert_frame_equal(self.data[mask], root.right.dataframe)
+        pd.testing.assert_frame_equal(self.data[~mask], root.left.dataframe)
+        inner = (root.right.dataframe.X > .5).to_numpy()
+        root.right.split(inner, self.cube.copy(), root.right.cube)
+        pd.testing.assert_frame_equal(self.data[mask & (self.data.X > .5)], root.right.right.dataframe)
+        self.assertEqual(list(range(len(self.data))), sorted(root.indices))
+        self.assertEqual(3, root.leaves)
+
+    def test_split_without_indices(self):
+        root = Node(self.data, self.cube)
+        mask = (self.data.Y > .3).to_numpy()
+        root.split(mask, self.cube.copy(), self.cube)
+        pd.testing.assert_frame_equal(self.data[mask], root.right.dataframe)
+        pd.testing.assert_frame_equal(self.data[~mask], root.left.dataframe)
+
+
+class TestExACT(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.data = pd.DataFrame(rng.uniform(0, 1, (60, 2)), columns=['X', 'Y'])
+        self.data['Z'] = rng.choice(['a', 'b', 'c'], 60)
+
+    def test_encoded(self):
+        exact = ExACT(output=Target.CLASSIFICATION)
+        exact._matrix = ExACT._remove_string_label(self.data).to_numpy(dtype=float)
+        exact._codes = pd.factorize(self.data.Z)[0]
+        for positions in [np.arange(60), np.arange(59, -1, -2), np.flatnonzero(self.data.Z != 'a')]:
+            expected = ExACT._remove_string_label(self.data.iloc[positions]).to_numpy(dtype=float)
+            self.assertTrue(np.array_equal(expected, exact._encoded(positions)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+import numpy as np
+import pandas as pd
+from sklearn.cluster import DBSCAN
+
+from psyke.clustering.utils import select_gaussian_mixture, stratified_sample, _increase_dbscan_epsilon
+
+
+class TestSelectGaussianMixture(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.data = pd.DataFrame(np.concatenate([rng.normal(0, .5, (300, 2)), rng.normal(4, .5, (300, 2)),
+                                                 rng.normal((0, 4), .5, (300, 2))]), columns=['X', 'Y'])
+        self.data['Z'] = np.repeat(['a', 'b', 'c'], 300)
+
+    def select(self, **kwargs):
+        np.random.seed(0)
+        return select_gaussian_mixture(self.data.iloc[:, :-1], 5, **kwargs)
+
+    def test_parallel(self):
+        sequential, parallel = self.select(n_jobs=1), self.select(n_jobs=4)
+        self.assertEqual(sequential[:2], parallel[:2])
+        bic, n, model = sequential
+        self.assertAlmostEqual(model.bic(self.data.iloc[:, :-1]) / n, bic, delta=abs(bic) * 1e-3)
+
+    def test_sample(self):
+        bic, n, model = self.select(sample_size=150)
+        self.assertAlmostEqual(model.bic(self.data.iloc[:, :-1]) / n, bic)
+
+    def test_stratified_sample(self):
+        sample = stratified_sample(self.data.iloc[:450], 90, np.random.RandomState(0))
+        self.assertEqual({'a': 60, 'b': 30}, sample.Z.value_counts().to_dict())
+        self.assertTrue(sample.index.is_monotonic_increasing)
+        numeric = self.data.assign(Z=np.arange(len(self.data), dtype=float))
+        self.assertEqual(90, len(stratified_sample(numeric, 90, np.random.RandomState(0))))
+
+
+class TestDBSCANEpsilon(unittest.TestCase):
+
+    @staticmethod
+    def increase(data: pd.DataFrame, epsilon: float, clusters: int) -> float:
+        k = 1.
+        for _ in range(1000):
+            if len(np.unique(DBSCAN(eps=epsilon * k).fit_predict(data))) < clusters + 1:
+                break
+            k += .1
+        return epsilon * k
+
+    def test_increase_epsilon(self):
+        rng = np.random.RandomState(0)
+        data = pd.DataFrame(np.concatenate([rng.normal(c, .3, (60, 2)) for c in rng.uniform(0, 10, (4, 2))]))
+        for epsilon, clusters in [(.01, 2), (.05, 3), (.2, 1), (1., 2)]:
+            self.assertEqual(self.increase(data, epsilon, clusters), _increase_dbscan_epsilon(data, epsilon, clusters))
+
+
+if __name__ == '__main__':
+    unittest.main()
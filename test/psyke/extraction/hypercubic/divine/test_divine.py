@@ -0,0 +1,34 @@
+import unittest
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import KNeighborsClassifier
+
+from psyke.extraction.hypercubic.divine import DiViNE
+
+
+class TestDiViNE(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.data = pd.DataFrame(rng.uniform(0, 1, (300, 2)), columns=['X', 'Y'])
+        self.data['Z'] = np.where((self.data.X > .5) ^ (self.data.Y > .3), 'a', 'b')
+        self.predictor = KNeighborsClassifier(5).fit(self.data.iloc[:, :-1], self.data.Z)
+
+    def test_clean(self):
+        extractor = DiViNE(self.predictor, k=5)
+        idx = DiViNE.neighbour_graph(self.data.iloc[:, :-1], 5)
+        pure = [len(self.data.Z.iloc[indices].unique()) == 1 for indices in idx]
+        pd.testing.assert_frame_equal(self.data[pure], extractor._DiViNE__clean(self.data))
+
+    def test_precomputed_neighbours(self):
+        extractor = DiViNE(self.predictor, k=5)
+        extractor.extract(self.data)
+        reusing = DiViNE(self.predictor, k=5, neighbours=DiViNE.neighbour_graph(self.data.iloc[:, :-1], 8))
+        reusing.extract(self.data)
+        self.assertEqual([c.dimensions for c in extractor._hypercubes], [c.dimensions for c in reusing._hypercubes])
+        with self.assertRaises(ValueError):
+            DiViNE(self.predictor, k=5, neighbours=reusing.neighbours[:, :3]).extract(self.data)
+
+
+if __name__ == '__main__':
+    unittest.main()
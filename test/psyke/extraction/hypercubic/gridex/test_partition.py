@@ -0,0 +1,104 @@
+import unittest
+from itertools import product
+import numpy as np
+import pandas as pd
+from sklearn.dummy import DummyRegressor
+
+from psyke.extraction.hypercubic import HyperCube
+from psyke.extraction.hypercubic import Grid
+from psyke.extraction.hypercubic.gridex import GridEx
+from psyke.extraction.hypercubic.utils import SamplePool
+
+
+class TestPartition(unittest.TestCase):
+
+    def setUp(self):
+        self.partition = GridEx.Partition({'X': [(0.0, 0.5), (0.5, 1.0)], 'Y': [(0.0, 1.0 / 3), (1.0 / 3, 2.0 / 3),
+                                                                              (2.0 / 3, 1.0)]})
+        self.bottom = HyperCube({'X': (0.0, 0.5), 'Y': (0.0, 2.0 / 3)})
+        self.top = HyperCube({'X': (0.0, 1.0), 'Y': (2.0 / 3, 1.0)})
+        self.partition.add(self.bottom)
+        self.partition.add(self.top)
+
+    def test_cells(self):
+        cells = self.partition.cells(np.array([[0.1, 0.1], [0.9, 0.5], [0.6, 0.9], [1.5, 0.5], [0.5, 0.5],
+                                               [np.nan, 0.5]]))
+        self.assertEqual([0, 4, 5, -1, -1, -1], list(cells))
+
+    def test_add(self):
+        self.assertEqual({0, 1, 2, 5}, set(self.partition.children.keys()))
+        self.assertIs(self.bottom, self.partition.children[1])
+        self.assertIs(self.top, self.partition.children[5])
+
+    def test_locate(self):
+        nested = GridEx.Partition({'X': [(0.0, 0.25), (0.25, 0.5)], 'Y': [(0.0, 2.0 / 3)]})
+        left = HyperCube({'X': (0.0, 0.25), 'Y': (0.0, 2.0 / 3)})
+        nested.add(left)
+        self.partition.replace(self.bottom, nested)
+        self.assertEqual({'X', 'Y'}, self.partition.split_features())
+        indices = {id(left): 0, id(self.top): 1}
+        located = self.partition.locate(np.array([[0.1, 0.1], [0.4, 0.1], [0.9, 0.9], [0.9, 0.1]]), indices)
+        self.assertEqual([0, -1, 1, -1], list(located))
+
+
+class TestCountCells(unittest.TestCase):
+
+    def test_count_cells(self):
+        rng = np.random.RandomState(0)
+        data = np.concatenate([rng.uniform(-0.2, 1.2, (500, 2)), [[0.5, 0.0], [1.0, 1.0], [0.0, 1.0 / 3]]])
+        ranges = [[(0.0, 0.25), (0.25, 0.5), (0.5, 1.0)], [(0.0, 1.0 / 3), (1.0 / 3, 2.0 / 3), (2.0 / 3, 1.0)]]
+        expected = {}
+        for p in product(*[range(len(r)) for r in ranges]):
+            n = HyperCube({'X': ranges[0][p[0]], 'Y': ranges[1][p[1]]}).filter_indices(data).sum()
+            if n > 0:
+                expected[p] = n
+        counts = GridEx._count_cells(ranges, data)
+        self.assertEqual(expected, counts)
+        self.assertEqual(sorted(counts.keys()), list(counts.keys()))
+
+    def test_adjacent_cells(self):
+        adjacent = GridEx._adjacent_cells([(0, 0), (2, 2)], (3, 4))
+        self.assertEqual([(0, 0), (0, 1), (1, 0), (1, 2), (2, 1), (2, 2), (2, 3)], adjacent)
+        self.assertEqual([], GridEx._adjacent_cells([], (3, 4)))
+
+
+class TestMerge(unittest.TestCase):
+
+    def setUp(self):
+        x = np.linspace(0.005, 0.995, 100)
+        self.data = pd.DataFrame({'X': np.tile(x, 2), 'Y': np.repeat([0.25, 0.75], 100)})
+        self.extractor = GridEx(DummyRegressor(), Grid(), min_examples=1, threshold=.1)
+
+    def merge(self, targets: list[float], cells: list[HyperCube]) -> list[dict]:
+        n = len(targets)
+        self.data['Z'] = np.array(targets)[np.minimum((self.data.X * n).astype(int), n - 1)]
+        merged = self.extractor._merge(cells, SamplePool(self.data))
+        return sorted([cube.dimensions for cube in merged], key=lambda d: (d['X'], d['Y']))
+
+    def test_merge(self):
+        cells = [HyperCube({'X': (a / 4, (a + 1) / 4), 'Y': (b / 2, (b + 1) / 2)}) for a in range(4) for b in range(2)]
+        self.assertEqual([{'X': (0.0, 0.5), 'Y': (0.0, 1.0)}, {'X': (0.5, 1.0), 'Y': (0.0, 1.0)}],
+                         self.merge([0.0, 0.0, 1.0, 1.15], cells))
+        self.assertEqual([{'X': (0.0, 0.25), 'Y': (0.0, 1.0)}, {'X': (0.75, 1.0), 'Y': (0.0, 1.0)}],
+                         self.merge([0.0, 0.0, 1.0, 1.15], cells[:2] + cells[6:]))
+
+    def test_merge_lowest_diversity(self):
+        cells = [HyperCube({'X': (a / 4, (a + 1) / 4), 'Y': (0.0, 1.0)}) for a in range(4)]
+        self.assertEqual([{'X': (0.0, 0.25), 'Y': (0.0, 1.0)}, {'X': (0.25, 0.75), 'Y': (0.0, 1.0)},
+                          {'X': (0.75, 1.0), 'Y': (0.0, 1.0)}], self.merge([0.0, 0.16, 0.3, 2.0], cells))
+
+    def test_merge_constant_diversity(self):
+        self.data['Z'] = 151.3
+        pool = SamplePool(self.data)
+        edges = [0.0, 0.07, 0.2, 0.33, 1.0]
+        cells = [HyperCube({'X': (a, b), 'Y': (0.0, 1.0)}) for a, b in zip(edges, edges[1:])]
+        statistics = [self.extractor._statistics(cell, pool) for cell in cells]
+        union = statistics[0][0]
+        for cell_statistics, _ in statistics[1:]:
+            union = union + cell_statistics
+        self.assertEqual(0., self.extractor._evaluate_merge(cells[0], cells[1], union, [rows for _, rows in statistics],
+                                                            pool))
+
+
+if __name__ == '__main__':
+    unittest.main()
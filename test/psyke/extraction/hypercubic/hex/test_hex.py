@@ -0,0 +1,43 @@
+import unittest
+import numpy as np
+import pandas as pd
+from sklearn.tree import DecisionTreeRegressor
+
+from psyke.extraction.hypercubic import Grid, HyperCube
+from psyke.extraction.hypercubic.hex import HEx
+from psyke.extraction.hypercubic.strategy import FixedStrategy
+
+
+class TestHEx(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.data = pd.DataFrame(rng.uniform(0, 1, (400, 2)), columns=['X', 'Y'])
+        self.data['Z'] = np.where(self.data.X > .5, 1.0, 0.0) + self.data.Y
+        self.predictor = DecisionTreeRegressor(max_depth=4).fit(self.data.iloc[:, :-1], self.data.Z)
+
+    def extract(self, data: pd.DataFrame, sparse: bool) -> HEx:
+        extractor = HEx(self.predictor, Grid(2, FixedStrategy(3)), min_examples=20, threshold=.1, seed=0,
+                        sparse=sparse)
+        extractor.extract(data)
+        return extractor
+
+    def test_sparse(self):
+        # all the cells contain training points, so no cell is dropped
+        dense, sparse = self.extract(self.data, False), self.extract(self.data, True)
+        self.assertEqual([c.dimensions for c in dense._hypercubes], [c.dimensions for c in sparse._hypercubes])
+        self.assertEqual(list(dense.predict(self.data.iloc[:, :-1])), list(sparse.predict(self.data.iloc[:, :-1])))
+
+    def test_sparse_empty_cells(self):
+        data = self.data[((self.data.X < .3) & (self.data.Y < .3)) | ((self.data.X > .7) & (self.data.Y > .7))]
+        extractor = HEx(self.predictor, Grid(1, FixedStrategy(3)), min_examples=20, threshold=.1, seed=0,
+                        sparse=True)
+        cells, _ = extractor._create_cells(HyperCube.create_surrounding_cube(data), 0, data,
+                                           data.iloc[:, :-1].to_numpy(), keep_empty=True)
+        self.assertEqual(6, len(cells))
+        extractor.extract(data)
+        self.assertTrue(all(p is not None for p in extractor.predict(data.iloc[:, :-1])))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+import numpy as np
+
+from psyke.extraction.hypercubic import HyperCube
+from psyke.extraction.hypercubic.iter import ITER
+
+
+class TestExpansions(unittest.TestCase):
+
+    def setUp(self):
+        self.cube = HyperCube({'X': (0.4, 0.6), 'Y': (0.4, 0.6)})
+        self.other = HyperCube({'X': (0.0, 0.1), 'Y': (0.0, 0.1)})
+        self.expansions = {
+            (id(self.cube), 'X', '+'): [HyperCube({'X': (0.6, 0.7), 'Y': (0.4, 0.6)}), None, None],
+            (id(self.cube), 'X', '-'): [HyperCube({'X': (0.3, 0.4), 'Y': (0.4, 0.6)}), None, None],
+            (id(self.other), 'X', '+'): [HyperCube({'X': (0.1, 0.2), 'Y': (0.0, 0.1)}), None, None],
+            (id(self.other), 'Y', '+'): [HyperCube({'X': (0.0, 0.1), 'Y': (0.1, 0.2)}), None, None]
+        }
+
+    def test_invalidate_expanded(self):
+        ITER._invalidate_expansions(self.expansions, self.cube, True)
+        self.assertEqual({(id(self.other), 'X', '+'), (id(self.other), 'Y', '+')}, set(self.expansions.keys()))
+
+    def test_invalidate_intersecting(self):
+        created = HyperCube({'X': (0.2, 0.3), 'Y': (0.0, 0.45)})
+        ITER._invalidate_expansions(self.expansions, created, False)
+        self.assertEqual({(id(self.cube), 'X', '+'), (id(self.other), 'Y', '+')}, set(self.expansions.keys()))
+
+
+class TestCoverage(unittest.TestCase):
+
+    def test_update_coverage(self):
+        data = np.random.RandomState(0).uniform(0, 1, (200, 2))
+        cubes = [HyperCube({'X': (0.0, 0.3), 'Y': (0.0, 1.0)}), HyperCube({'X': (0.5, 0.7), 'Y': (0.2, 0.4)})]
+        covered = np.zeros(len(data), dtype=bool)
+        ITER._update_coverage(covered, data, cubes[:1])
+        self.assertEqual(list(cubes[0].filter_indices(data)), list(covered))
+        cubes[0].update_dimension('X', (0.0, 0.4))
+        ITER._update_coverage(covered, data, cubes)
+        self.assertEqual(list(cubes[0].filter_indices(data) | cubes[1].filter_indices(data)), list(covered))
+
+
+if __name__ == '__main__':
+    unittest.main()
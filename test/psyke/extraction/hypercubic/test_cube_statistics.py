@@ -0,0 +1,56 @@
+import unittest
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression
+
+from psyke.utils import Target
+from psyke.extraction.hypercubic.utils import CubeStatistics
+
+
+class TestCubeStatistics(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.x = rng.uniform(0, 1, (100, 3))
+        self.y = self.x @ np.array([1.0, -2.0, 0.5]) + 3 + rng.normal(0, .1, 100)
+        self.labels = np.where(self.x[:, 0] > .3, 'a', np.where(self.x[:, 1] > .5, 'b', 'c'))
+
+    def test_constant(self):
+        union = CubeStatistics.from_samples(self.x[:30], self.y[:30], Target.CONSTANT) + \
+            CubeStatistics.from_samples(self.x[30:], self.y[30:], Target.CONSTANT)
+        self.assertEqual(100, union.n)
+        self.assertAlmostEqual(np.mean(self.y), union.mean)
+        self.assertAlmostEqual(np.std(self.y), union.std)
+        self.assertTrue(np.allclose(self.x.mean(axis=0), union.barycenter))
+
+    def test_regression(self):
+        union = CubeStatistics.from_samples(self.x[:30], self.y[:30], Target.REGRESSION) + \
+            CubeStatistics.from_samples(self.x[30:], self.y[30:], Target.REGRESSION)
+        model = LinearRegression().fit(self.x, self.y)
+        self.assertTrue(np.allclose(np.concatenate([[model.intercept_], model.coef_]), union.least_squares()))
+
+    def test_classification(self):
+        codes = pd.factorize(self.labels)[0]
+        union = CubeStatistics.from_samples(self.x[:30], codes[:30], Target.CLASSIFICATION) + \
+            CubeStatistics.from_samples(self.x[30:], codes[30:], Target.CLASSIFICATION)
+        self.assertEqual(list(np.bincount(codes)), list(union.counts))
+        self.assertAlmostEqual(1 - np.bincount(codes).max() / 100, union.misclassification)
+
+    def test_empty(self):
+        empty = CubeStatistics.from_samples(self.x[:0], self.y[:0], Target.CONSTANT)
+        self.assertTrue(np.isnan(empty.std))
+        self.assertAlmostEqual(np.std(self.y), (empty + CubeStatistics.from_samples(self.x, self.y,
+                                                                                    Target.CONSTANT)).std)
+
+
+    def test_constant_labels(self):
+        for label in [0.1, 1 / 3, 151.3]:
+            y = np.full(100, label)
+            union = CubeStatistics.from_samples(self.x[:7], y[:7], Target.CONSTANT)
+            for start, end in [(7, 20), (20, 33), (33, 100)]:
+                union = union + CubeStatistics.from_samples(self.x[start:end], y[start:end], Target.CONSTANT)
+            self.assertEqual(0., union.std)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import pickle
+import unittest
+import numpy as np
+import pandas as pd
+
+from psyke import Target
+from psyke.extraction.hypercubic import HyperCube, ClosedCube, RegressionCube, ClassificationCube, HyperCubeSet
+from psyke.extraction.hypercubic.hypercube import FeatureNotFoundException
+from psyke.hypercubepredictor import HyperCubePredictor
+
+
+class TestHyperCubeSet(unittest.TestCase):
+
+    def setUp(self):
+        self.cubes = [HyperCube({'X': (0.0, 0.5), 'Y': (0.0, 0.5)}, output=1.0),
+                      ClosedCube({'X': (0.5, 1.0), 'Y': (0.0, 0.5)}, output=2.0),
+                      HyperCube({'X': (0.0, 1.0), 'Y': (0.0, 1.0)}, output=3.0)]
+        self.cubes[1].set_infinite('X', '+')
+        self.cubes[2].set_infinite('Y', '-')
+        self.cubes[2].set_infinite('Y', '+')
+        self.cubes[2].set_default()
+        self.cubes[0].init_diversity(0.25)
+        self.set = HyperCubeSet.from_cubes(self.cubes)
+
+    def assertSameCube(self, expected: HyperCube, actual: HyperCube):
+        self.assertIs(type(expected), type(actual))
+        self.assertEqual(expected.dimensions, actual.dimensions)
+        self.assertEqual({k: set(v) for k, v in expected._infinite_dimensions.items()},
+                         {k: set(v) for k, v in actual._infinite_dimensions.items()})
+        self.assertEqual(expected.output, actual.output)
+        self.assertEqual(expected.is_default, actual.is_default)
+        self.assertEqual(expected.diversity, actual.diversity)
+
+    def test_from_cubes(self):
+        self.assertEqual(3, len(self.set))
+        self.assertEqual(['X', 'Y'], self.set.features)
+        self.assertEqual([False, True, False], list(self.set.closed))
+        self.assertEqual([1.0, 2.0, 3.0], list(self.set.outputs))
+        for expected, actual in zip(self.cubes, self.set):
+            self.assertSameCube(expected, actual)
+        self.assertSameCube(self.cubes[-1], self.set[-1])
+
+    def test_intervals(self):
+        lower, upper = self.set.intervals(['Y', 'X'])
+        self.assertEqual([[0.0, 0.0], [0.0, 0.5], [-np.inf, 0.0]], lower.tolist())
+        self.assertEqual([[0.5, 0.5], [0.5, np.inf], [np.inf, 1.0]], upper.tolist())
+        self.assertEqual([0.25, 0.25, 1.0], list(self.set.volumes()))
+        with self.assertRaises(FeatureNotFoundException):
+            self.set.intervals(['Z'])
+
+    def test_slice_and_add(self):
+        tail = self.set[1:]
+        self.assertEqual(2, len(tail))
+        self.assertSameCube(self.cubes[1], tail[0])
+        joined = tail + [self.cubes[0]]
+        self.assertEqual([2.0, 3.0, 1.0], list(joined.outputs))
+        self.assertSameCube(self.cubes[0], joined[2])
+
+    def test_classification(self):
+        cubes = HyperCubeSet.from_cubes([ClassificationCube({'X': (0.0, 1.0)}, output='a'),
+                                         ClassificationCube({'X': (1.0, 2.0)}, output='b')])
+        self.assertEqual(['a', 'b'], [cube.output for cube in cubes])
+
+    def test_regression(self):
+        data = pd.DataFrame(np.random.RandomState(0).uniform(0, 1, (50, 2)), columns=['X', 'Y'])
+        cubes = [RegressionCube({'X': (0.0, 0.5), 'Y': (0.0, 1.0)}), RegressionCube({'X': (0.5, 1.0), 'Y': (0.0, 1.0)})]
+        cubes[0].output.fit(data, 2 * data.X - data.Y + 1)
+        packed = HyperCubeSet.from_cubes(cubes)
+        self.assertTrue(np.allclose([1.0, 2.0, -1.0], packed.coefficients[0]))
+        self.assertTrue(np.isnan(packed.coefficients[1]).all())
+        self.assertTrue(np.allclose(cubes[0].output.predict(data.values), packed[0].output.predict(data.values)))
+        self.assertFalse(hasattr(packed[1].output, 'coef_'))
+
+    def test_packed_predictor(self):
+        predictor = HyperCubePredictor(output=Target.CONSTANT)
+        predictor._hypercubes = self.cubes
+        data = pd.DataFrame(np.random.RandomState(0).uniform(-0.5, 1.5, (100, 2)), columns=['X', 'Y'])
+        expected = predictor.predict(data)
+        predictor.pack()
+        self.assertIsInstance(predictor._hypercubes, HyperCubeSet)
+        self.assertEqual(list(expected), list(predictor.predict(data)))
+        self.assertEqual(list(expected), list(pickle.loads(pickle.dumps(predictor)).predict(data)))
+
+
+if __name__ == '__main__':
+    unittest.main()
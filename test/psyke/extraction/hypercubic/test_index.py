@@ -0,0 +1,127 @@
+import unittest
+import numpy as np
+
+from psyke.extraction.hypercubic import HyperCube
+from psyke.extraction.hypercubic.index import HyperCubeIndex, OverlapIndex, NeighbourIndex
+
+
+class TestHyperCubeIndex(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.lower = rng.uniform(0, 1, (200, 3))
+        self.upper = self.lower + rng.uniform(0, .3, (200, 3))
+        self.lower[5, 0] = -np.inf
+        self.upper[7, 1] = np.inf
+        self.closed = rng.uniform(0, 1, 200) > .5
+        self.points = np.concatenate([rng.uniform(-.2, 1.5, (1000, 3)), self.lower[:20], self.upper[:20]])
+
+    def scan(self, points: np.ndarray, n: int = 200) -> list[int]:
+        result = []
+        lower, upper, closed = self.lower[:n], self.upper[:n], self.closed[:n]
+        for point in points:
+            inside = np.all((lower <= point) & ((point < upper) | (closed[:, np.newaxis] & (point == upper))), axis=1)
+            result.append(int(np.argmax(inside)) if inside.any() else -1)
+        return result
+
+    def test_query(self):
+        index = HyperCubeIndex(self.lower, self.upper, self.closed, leaf_size=4)
+        self.assertEqual(self.scan(self.points), list(index.query(self.points)))
+
+    def test_single_leaf(self):
+        index = HyperCubeIndex(self.lower[:3], self.upper[:3], self.closed[:3])
+        self.assertEqual(len(index), 3)
+        self.assertEqual(self.scan(self.points, 3), list(index.query(self.points)))
+
+    def test_empty(self):
+        index = HyperCubeIndex(np.zeros((0, 3)), np.zeros((0, 3)), np.zeros(0, dtype=bool))
+        self.assertEqual([-1, -1], list(index.query(self.points[:2])))
+
+
+class TestOverlapIndex(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        lower = rng.uniform(0, 1, (60, 2))
+        upper = lower + rng.uniform(0, .2, (60, 2))
+        self.cubes = [HyperCube({'X': (a[0], b[0]), 'Y': (a[1], b[1])}) for a, b in zip(lower, upper)]
+        self.cubes.append(self.cubes[3].copy())
+        self.index = OverlapIndex(self.cubes)
+
+    def scan(self, cube: HyperCube) -> HyperCube | None:
+        return next((other for other in self.cubes if cube != other and cube.overlap(other)), None)
+
+    def test_overlap(self):
+        for cube in self.cubes + [HyperCube({'X': (.5, .6), 'Y': (-1., 2.)})]:
+            self.assertIs(self.scan(cube), cube.overlap(self.index))
+
+    def test_update(self):
+        cube = self.cubes[0]
+        cube.update_dimension('X', (-1., 2.))
+        self.index.update(cube)
+        self.assertIs(self.scan(cube), cube.overlap(self.index))
+        self.assertNotIn(0, self.index.overlapping(cube))
+        added = HyperCube({'X': (5., 6.), 'Y': (5., 6.)})
+        self.assertIsNone(added.overlap(self.index))
+        self.index.add(added)
+        self.assertTrue(self.index.equal(added.copy()))
+        self.assertIsNone(added.overlap(self.index))
+
+    def test_many_updates(self):
+        rng = np.random.RandomState(1)
+        for _ in range(100):
+            cube = self.cubes[rng.randint(len(self.cubes))]
+            lower, upper = cube['X']
+            cube.update_dimension('X', (lower - rng.uniform(0, .05), upper + rng.uniform(0, .05)))
+            self.index.update(cube)
+            if rng.uniform() < .3:
+                bounds = np.sort(rng.uniform(0, 1, (2, 2)), axis=1)
+                added = HyperCube({'X': tuple(bounds[0]), 'Y': tuple(bounds[1])})
+                self.index.add(added)
+                self.cubes.append(added)
+            for other in self.cubes[::7]:
+                self.assertIs(self.scan(other), other.overlap(self.index))
+
+    def test_check_overlap(self):
+        disjoint = [HyperCube({'X': (a, a + .1), 'Y': (0., 1.)}) for a in np.linspace(0, .9, 10)]
+        self.assertFalse(HyperCube.check_overlap(disjoint, disjoint))
+        self.assertTrue(HyperCube.check_overlap(self.cubes, self.cubes))
+
+
+class TestNeighbourIndex(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.points = rng.uniform(0, 1, (500, 2))
+        self.queries = rng.uniform(-.1, 1.1, (50, 2))
+        self.index = NeighbourIndex(self.points, leaf_size=4)
+
+    def scan(self) -> list[int]:
+        alive = np.flatnonzero(self.index.alive)
+        distances = np.linalg.norm(self.queries[:, np.newaxis, :] - self.points[alive][np.newaxis, :, :], axis=2)
+        return list(alive[distances.argmin(axis=1)])
+
+    def test_remove_and_add(self):
+        rng = np.random.RandomState(1)
+        for _ in range(20):
+            self.index.remove(rng.choice(500, 30))
+            self.index.add(rng.choice(500, 10))
+            self.assertEqual(int(self.index.alive.sum()), len(self.index))
+            self.assertEqual(self.scan(), list(self.index.nearest(self.queries)[1]))
+
+    def test_within(self):
+        lower, upper = np.array([.2, .3]), np.array([.6, .5])
+        self.index.remove(np.arange(0, 500, 3))
+        inside = np.all((lower <= self.points) & (self.points < upper), axis=1) & self.index.alive
+        self.assertEqual(list(np.flatnonzero(inside)), sorted(self.index.within(lower, upper)))
+
+    def test_empty(self):
+        self.index.remove(np.arange(500))
+        self.assertEqual(0, len(self.index))
+        self.assertEqual([-1] * 50, list(self.index.nearest(self.queries)[1]))
+        self.index.add([7])
+        self.assertEqual([7] * 50, list(self.index.nearest(self.queries)[1]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import unittest
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.tree import DecisionTreeRegressor
+
+from psyke.extraction.hypercubic import HyperCube, RegressionCube, ClassificationCube
+from psyke.extraction.hypercubic.utils import Oracle
+
+
+class CountingOracle(Oracle):
+
+    def __init__(self, predictor):
+        super().__init__(predictor)
+        self.calls = 0
+
+    def predict(self, dataframe: pd.DataFrame) -> np.ndarray:
+        self.calls += 1
+        return super().predict(dataframe)
+
+
+class CountingPredictor:
+
+    def __init__(self, predictor):
+        self.predictor = predictor
+        self.sizes = []
+
+    def predict(self, dataframe: pd.DataFrame) -> np.ndarray:
+        self.sizes.append(len(dataframe))
+        return self.predictor.predict(dataframe)
+
+
+class TestOracle(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.x = pd.DataFrame(rng.uniform(0, 1, (100, 2)), columns=['X', 'Y'])
+        self.y = self.x.X * 2 + self.x.Y
+        self.regressor = DecisionTreeRegressor(max_depth=3).fit(self.x, self.y)
+        self.classifier = KNeighborsClassifier(3).fit(self.x, np.where(self.x.X > .5, 'a', 'b'))
+
+    def test_label(self):
+        oracle = CountingOracle(self.regressor)
+        labelled = oracle.label(self.x, 'Z')
+        self.assertEqual(['X', 'Y', 'Z'], list(labelled.columns))
+        self.assertEqual(list(self.regressor.predict(self.x)), list(labelled.Z))
+        self.assertEqual(0, len(oracle.label(self.x.iloc[:0], 'Z')))
+        self.assertEqual(1, oracle.calls)
+
+    def test_batches(self):
+        predictor = CountingPredictor(self.classifier)
+        labelled = Oracle(predictor, batch_size=30).label(self.x, 'Z')
+        self.assertEqual([30, 30, 30, 10], predictor.sizes)
+        self.assertEqual(list(self.classifier.predict(self.x)), list(labelled.Z))
+
+    def test_gridex_batches(self):
+        from psyke.extraction.hypercubic import Grid
+        from psyke.extraction.hypercubic.gridex import GridEx
+        from psyke.extraction.hypercubic.strategy import FixedStrategy
+        predictor = CountingPredictor(self.regressor)
+        extractor = GridEx(predictor, Grid(2, FixedStrategy(3)), min_examples=20, threshold=.01)
+        extractor.extract(self.x.assign(Z=self.y))
+        # relabelling the training set, updating the surrounding cube and at most one call per iteration
+        self.assertTrue(len(predictor.sizes) <= 2 + 3)
+
+    def test_hex_theory(self):
+        from psyke.extraction.hypercubic import Grid
+        from psyke.extraction.hypercubic.hex import HEx
+        from psyke.extraction.hypercubic.strategy import FixedStrategy
+        extractor = HEx(self.regressor, Grid(2, FixedStrategy(2)), min_examples=20, threshold=.3, seed=0)
+        extractor.extract(self.x.assign(Z=self.y))
+        # the theory extracted when the samples were labelled by querying the predictor at every update
+        expected = [((0.74421, 0.988376), (0.501771, 0.998849), 2.36),
+                    ((0.011712, 0.500044), (0.004693, 0.501771), 0.71),
+                    ((0.011712, 0.500044), (0.501771, 0.998849), 1.28),
+                    ((0.500044, 0.988376), (0.004693, 0.501771), 1.79),
+                    ((0.500044, 0.988376), (0.501771, 0.998849), 1.85)]
+        self.assertEqual(expected, [(tuple(np.round(cube['X'], 6)), tuple(np.round(cube['Y'], 6)),
+                                     round(cube.output, 2)) for cube in extractor._hypercubes])
+
+    def test_update(self):
+        for cube_type, predictor in [(HyperCube, self.regressor), (RegressionCube, self.regressor),
+                                     (ClassificationCube, self.classifier)]:
+            oracle = CountingOracle(predictor)
+            labelled = oracle.label(self.x, 'Z')
+            expected, actual = cube_type({'X': (0.2, 0.7), 'Y': (0.1, 0.9)}), \
+                cube_type({'X': (0.2, 0.7), 'Y': (0.1, 0.9)})
+            expected.update(labelled, predictor)
+            actual.update(labelled, oracle)
+            self.assertEqual(1, oracle.calls)
+            if cube_type is RegressionCube:
+                self.assertTrue(np.allclose(expected.output.coef_, actual.output.coef_))
+            else:
+                self.assertEqual(expected.output, actual.output)
+            self.assertAlmostEqual(expected.diversity, actual.diversity)
+            self.assertEqual(expected.barycenter.dimensions, actual.barycenter.dimensions)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+from statistics import mode
+import numpy as np
+import pandas as pd
+
+from psyke.extraction.hypercubic import ClassificationCube
+from psyke.extraction.hypercubic.utils import SamplePool, Oracle
+
+
+class TestSamplePool(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.data = pd.DataFrame(rng.uniform(0, 1, (20, 2)), columns=['X', 'Y'])
+        self.data['Z'] = np.where(self.data.X > .5, 'a', 'b')
+        self.more = pd.DataFrame(rng.uniform(0, 1, (30, 2)), columns=['X', 'Y'])
+        self.more['Z'] = np.where(self.more.Y > .5, 'a', 'c')
+
+    def test_append(self):
+        pool = SamplePool(self.data)
+        pool.append(self.more)
+        pool.append(self.more.iloc[:0])
+        self.assertEqual(50, len(pool))
+        self.assertEqual(['X', 'Y', 'Z'], pool.columns)
+        self.assertTrue(len(pool._x) >= 50)
+        expected = pd.concat([self.data, self.more], ignore_index=True)
+        pd.testing.assert_frame_equal(expected, pool.to_dataframe())
+
+    def test_append_dtype(self):
+        pool = SamplePool(self.data.assign(Z=1))
+        pool.append(self.more.assign(Z=.5))
+        self.assertEqual(np.float64, pool.y.dtype)
+        self.assertEqual([1.0] * 20 + [.5] * 30, list(pool.y))
+
+    def test_truncate(self):
+        pool = SamplePool(self.data)
+        pool.append(self.more)
+        pool.truncate(20)
+        self.assertEqual(20, len(pool))
+        pool.append(self.more.iloc[:5])
+        pd.testing.assert_frame_equal(pd.concat([self.data, self.more.iloc[:5]], ignore_index=True),
+                                      pool.to_dataframe())
+
+    def test_codes(self):
+        pool = SamplePool(self.data)
+        self.assertEqual(list(pd.unique(self.data.Z)), pool.classes)
+        pool.append(self.more)
+        self.assertEqual(list(pool.y), [pool.classes[c] for c in pool.codes])
+        pool.truncate(20)
+        pool.append(self.more.assign(Z='d'))
+        self.assertEqual(list(pool.y), [pool.classes[c] for c in pool.codes])
+        self.assertEqual(list(pool.y[5:]), [pool.classes[c] for c in pool[np.arange(5, 50)].codes])
+
+    def test_classification_ties(self):
+        data = pd.DataFrame({'X': np.linspace(0, .9, 10), 'Y': .5, 'Z': list('cabbaccabd')})
+        pool = SamplePool(data.iloc[::-1])
+        for lower in np.linspace(0, .8, 9):
+            for dataset, labels in [(pool, pool.y), (data, data.Z.to_numpy())]:
+                cube = ClassificationCube({'X': (lower, lower + .35), 'Y': (0.0, 1.0)})
+                cube.update(dataset, Oracle(None))
+                self.assertEqual(mode(labels[cube.filter_indices(dataset if dataset is pool else data.iloc[:, :-1])]),
+                                 cube.output)
+
+    def test_cube_update(self):
+        pool = SamplePool(self.data)
+        pool.append(self.more)
+        dataframe = pd.concat([self.data, self.more])
+        cube, other = ClassificationCube({'X': (0.2, 0.8), 'Y': (0.0, 0.6)}), \
+            ClassificationCube({'X': (0.2, 0.8), 'Y': (0.0, 0.6)})
+        cube.update(pool, Oracle(None))
+        other.update(dataframe, Oracle(None))
+        self.assertEqual(other.output, cube.output)
+        self.assertEqual(other.diversity, cube.diversity)
+        self.assertEqual(other.barycenter.dimensions, cube.barycenter.dimensions)
+        self.assertEqual(cube.count(dataframe), cube.count(pool))
+        self.assertEqual(cube.count(pool), len(pool[cube.filter_indices(pool)]))
+
+
+if __name__ == '__main__':
+    unittest.main()
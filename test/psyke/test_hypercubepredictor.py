@@ -0,0 +1,117 @@
+import unittest
+import numpy as np
+import pandas as pd
+from sklearn.exceptions import NotFittedError
+
+from psyke import Target
+from psyke.extraction.hypercubic import HyperCube, ClosedCube, RegressionCube
+from psyke.hypercubepredictor import HyperCubePredictor
+
+
+class TestHyperCubePredictor(unittest.TestCase):
+
+    def setUp(self):
+        self.predictor = HyperCubePredictor()
+        self.predictor._hypercubes = [
+            HyperCube({'X': (0.0, 0.5), 'Y': (0.0, 0.5)}, output=1.0),
+            ClosedCube({'X': (0.5, 1.0), 'Y': (0.0, 0.5)}, output=2.0),
+            HyperCube({'X': (0.0, 1.0), 'Y': (0.0, 1.0)}, output=3.0)
+        ]
+        self.predictor._hypercubes[1].set_infinite('X', '+')
+        rng = np.random.RandomState(0)
+        self.data = pd.concat([
+            pd.DataFrame(rng.uniform(-0.5, 1.5, (200, 2)), columns=['X', 'Y']),
+            pd.DataFrame([[0.5, 0.5], [1.0, 0.5], [0.0, 0.0], [1.0, 1.0]], columns=['X', 'Y'])
+        ], ignore_index=True)
+
+    def expected(self) -> list:
+        return [self.predictor._predict_from_cubes(row.to_dict()) for _, row in self.data.iterrows()]
+
+    def test_find_cube_indices(self):
+        indices = self.predictor._find_cube_indices(pd.DataFrame([[0.2, 0.2], [0.7, 0.5], [3.0, 0.2], [0.7, 0.7],
+                                                                  [2.0, 2.0]], columns=['X', 'Y']))
+        self.assertEqual([0, 1, 1, 2, -1], list(indices))
+
+    def test_predict(self):
+        self.assertEqual(self.expected(), list(self.predictor.predict(self.data)))
+
+    def test_predict_default(self):
+        self.predictor._hypercubes[-1].set_default()
+        predictions = self.predictor.predict(self.data)
+        self.assertEqual(self.expected(), list(predictions))
+        self.assertEqual(np.float64, predictions.dtype)
+
+    def test_predict_ignored_dimensions(self):
+        self.predictor._dimensions_to_ignore = {'Y'}
+        self.assertEqual(self.expected(), list(self.predictor.predict(self.data)))
+
+    def test_invalidate_cache(self):
+        point = pd.DataFrame([[0.2, 0.2]], columns=['X', 'Y'])
+        self.assertEqual([1.0], list(self.predictor.predict(point)))
+        self.predictor._hypercubes = self.predictor._hypercubes[1:]
+        self.assertEqual([3.0], list(self.predictor.predict(point)))
+        self.predictor._hypercubes[-1].update_dimension('X', (0.5, 1.0))
+        self.predictor._invalidate_cache()
+        self.assertEqual([None], list(self.predictor.predict(point)))
+
+    def test_predict_regression(self):
+        self.predictor = HyperCubePredictor(output=Target.REGRESSION)
+        self.predictor._hypercubes = [RegressionCube({'X': (0.0, 0.5), 'Y': (0.0, 1.0)}),
+                                      RegressionCube({'X': (0.5, 1.0), 'Y': (0.0, 1.0)})]
+        for i, cube in enumerate(self.predictor._hypercubes):
+            cube.output.fit(self.data, self.data.X * (i + 1) - self.data.Y)
+        predictions = self.predictor.predict(self.data)
+        for expected, predicted in zip(self.expected(), predictions):
+            if expected is None:
+                self.assertIsNone(predicted)
+            else:
+                self.assertAlmostEqual(expected, predicted)
+
+    def test_predict_masked(self):
+        values, mask = self.predictor.predict_masked(self.data)
+        expected = self.expected()
+        self.assertEqual([e is not None for e in expected], list(mask))
+        self.assertEqual([e for e in expected if e is not None], list(values[mask]))
+        self.assertTrue(np.isnan(values[~mask]).all())
+        self.predictor.normalization = {'X': (0, 1), 'Y': (0, 1), 'Z': (10.0, 2.0)}
+        self.assertEqual([2 * e + 10 for e in expected if e is not None],
+                         list(self.predictor.predict_masked(self.data)[0][mask]))
+
+    def test_predict_masked_classification(self):
+        self.predictor._output = Target.CLASSIFICATION
+        for cube, label in zip(self.predictor._hypercubes, ['b', 'a', 'b']):
+            cube._output = label
+        self.predictor._invalidate_cache()
+        values, mask = self.predictor.predict_masked(self.data)
+        self.assertIsInstance(values, pd.Categorical)
+        self.assertEqual(['a', 'b'], list(values.categories))
+        self.assertEqual(list(mask), list(values.codes >= 0))
+        self.assertEqual([e for e in self.expected() if e is not None], list(np.asarray(values[mask])))
+
+    def test_predict_regression_not_fitted(self):
+        self.predictor = HyperCubePredictor(output=Target.REGRESSION)
+        self.predictor._hypercubes = [RegressionCube({'X': (0.0, 1.0), 'Y': (0.0, 1.0)})]
+        with self.assertRaises(NotFittedError):
+            self.predictor.predict(self.data)
+        self.predictor._hypercubes[0].output.fit(self.data, 2 * self.data.Y + 1)
+        self.predictor._invalidate_cache()
+        self.assertEqual([2.0], list(self.predictor.predict(pd.DataFrame([[0.3, 0.5]], columns=['X', 'Y']))))
+
+    def test_brute_predict(self):
+        data = pd.DataFrame([[0.2, 0.2], [-1.0, -1.0], [3.0, 2.0], [1.2, 0.8]], columns=['X', 'Y'])
+        self.assertEqual([1.0, 1.0, 3.0, 3.0], list(self.predictor.brute_predict(data, 'corner')))
+        self.assertEqual([1.0, 1.0, 2.0, 2.0], list(self.predictor.brute_predict(data, 'center')))
+        tree, _ = self.predictor._create_brute_tree('center', 2, ['X', 'Y'])
+        self.assertIs(tree, self.predictor._create_brute_tree('center', 2, ['X', 'Y'])[0])
+        self.predictor._hypercubes = self.predictor._hypercubes[1:]
+        self.assertIsNot(tree, self.predictor._create_brute_tree('center', 2, ['X', 'Y'])[0])
+
+    def test_brute_predict_surface(self):
+        data = pd.DataFrame([[0.2, 0.2], [-1.0, -1.0], [3.0, 0.2], [1.2, 0.8], [0.2, 1.2]], columns=['X', 'Y'])
+        self.assertEqual([1.0, 1.0, 2.0, 3.0, 3.0], list(self.predictor.brute_predict(data, 'surface')))
+        self.predictor.chunk_size = 1
+        self.assertEqual([0, 0, 1, 2, 2], list(self.predictor._brute_predict_surface(data)))
+
+
+if __name__ == '__main__':
+    unittest.main()
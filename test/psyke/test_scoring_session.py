@@ -0,0 +1,87 @@
+import unittest
+import numpy as np
+import pandas as pd
+
+from psyke import EvaluableModel, ScoringSession
+from psyke.extraction.hypercubic import HyperCube
+from psyke.hypercubepredictor import HyperCubePredictor
+
+
+class CountingPredictor:
+
+    def __init__(self):
+        self.calls = 0
+
+    def predict(self, dataframe: pd.DataFrame) -> np.ndarray:
+        self.calls += 1
+        return np.where(dataframe.X < 0.5, 1.0, 2.0)
+
+
+class TestScoringSession(unittest.TestCase):
+
+    def setUp(self):
+        self.model = HyperCubePredictor()
+        self.model._hypercubes = [HyperCube({'X': (0.0, 0.5), 'Y': (0.0, 1.0)}, output=1.0),
+                                  HyperCube({'X': (0.5, 0.8), 'Y': (0.0, 1.0)}, output=3.0)]
+        self.data = pd.DataFrame(np.random.RandomState(0).uniform(0, 1, (100, 2)), columns=['X', 'Y'])
+        self.data['Z'] = np.where(self.data.X < 0.5, 1.0, 2.5)
+        self.predictor = CountingPredictor()
+
+    def test_score(self):
+        session = self.model.scoring_session(self.predictor)
+        metrics = [EvaluableModel.RegressionScore.MAE, EvaluableModel.RegressionScore.MSE]
+        expected = self.model.score(self.data, self.predictor, True, True, task=EvaluableModel.Task.REGRESSION,
+                                    scoring_function=metrics)
+        self.predictor.calls = 0
+        self.assertEqual(expected, session.score(self.data, True, True, task=EvaluableModel.Task.REGRESSION,
+                                                 scoring_function=metrics))
+        session.score(self.data, True, task=EvaluableModel.Task.REGRESSION,
+                      scoring_function=[EvaluableModel.RegressionScore.R2])
+        self.assertEqual(1, self.predictor.calls)
+        covered = self.data.X < 0.8
+        mae = np.abs(self.data.Z[covered] - np.where(self.data.X[covered] < 0.5, 1.0, 3.0)).mean()
+        self.assertAlmostEqual(mae, expected[0][EvaluableModel.RegressionScore.MAE][0])
+        self.assertAlmostEqual(covered.mean(), expected[1])
+
+    def test_shared_session(self):
+        metrics = [EvaluableModel.RegressionScore.MAE]
+        for _ in range(3):
+            self.model.score(self.data, self.predictor, True, task=EvaluableModel.Task.REGRESSION,
+                             scoring_function=metrics)
+        self.assertEqual(1, self.predictor.calls)
+        self.model._hypercubes = self.model._hypercubes[:1]
+        score = self.model.score(self.data, self.predictor, True, task=EvaluableModel.Task.REGRESSION,
+                                 scoring_function=metrics)
+        self.assertEqual(2, self.predictor.calls)
+        self.assertAlmostEqual((self.data.X < 0.5).mean(), score[1])
+
+    def test_extractor_metrics(self):
+        from sklearn.tree import DecisionTreeRegressor
+        from psyke import Extractor
+        from psyke.extraction.hypercubic import Grid
+        extractor = Extractor.gridex(DecisionTreeRegressor(max_depth=2).fit(self.data.iloc[:, :-1], self.data.Z),
+                                     Grid(1), min_examples=10)
+        extractor.extract(self.data)
+        metrics = [extractor.mae(self.data, self.predictor), extractor.mse(self.data, self.predictor),
+                   extractor.r2(self.data, self.predictor)]
+        self.assertEqual(1, self.predictor.calls)
+        self.assertEqual(metrics[0], extractor.mae(self.data, self.predictor))
+        extractor.extract(self.data)
+        extractor.mae(self.data, self.predictor)
+        self.assertEqual(2, self.predictor.calls)
+
+    def test_fingerprint(self):
+        fingerprint = ScoringSession.fingerprint(self.data)
+        self.assertEqual(fingerprint, ScoringSession.fingerprint(self.data.copy()))
+        changed = self.data.copy()
+        changed.iloc[0, 0] += 1
+        self.assertNotEqual(fingerprint, ScoringSession.fingerprint(changed))
+        self.assertNotEqual(fingerprint, ScoringSession.fingerprint(self.data.rename(columns={'Z': 'W'})))
+
+    def test_missing_predictor(self):
+        with self.assertRaises(ValueError):
+            self.model.scoring_session().score(self.data, True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,22 @@
+import unittest
+import numpy as np
+import pandas as pd
+
+from psyke.utils.metrics import mae, accuracy
+
+
+class TestMetrics(unittest.TestCase):
+
+    def test_mae_with_missing_predictions(self):
+        expected = pd.Series([1.0, 2.0, 3.0, 4.0])
+        self.assertEqual(0.5, mae(expected, np.array([1.5, None, 2.5, None], dtype=object)))
+        self.assertEqual(0.5, mae(expected, np.array([1.5, np.nan, 2.5, np.nan])))
+
+    def test_accuracy_with_missing_predictions(self):
+        expected = pd.Series(['a', 'b', 'a', 'b'])
+        self.assertEqual(0.5, accuracy(expected, np.array(['a', None, 'b', None], dtype=object)))
+        self.assertEqual(0.5, accuracy(expected, pd.Categorical(['a', None, 'b', None])))
+
+
+if __name__ == '__main__':
+    unittest.main()